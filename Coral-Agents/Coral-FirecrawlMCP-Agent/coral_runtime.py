@@ -0,0 +1,312 @@
+import os
+import asyncio
+import json
+import logging
+import traceback
+import re
+import xml.etree.ElementTree as ET
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class MentionMessage:
+    """A message from a wait_for_mentions response."""
+    __slots__ = ("thread_id", "sender_id", "content")
+
+    def __init__(self, thread_id: str, sender_id: str, content: str):
+        self.thread_id = thread_id
+        self.sender_id = sender_id
+        self.content = content
+
+    def __repr__(self):
+        return f"MentionMessage(thread_id={self.thread_id!r}, sender_id={self.sender_id!r}, content={self.content!r})"
+
+
+class MentionParseMetrics:
+    """Counters describing how mention payloads were parsed."""
+    __slots__ = ("payloads", "messages", "incomplete", "parse_errors", "salvaged", "dropped")
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Process-wide parse metrics, so malformed payloads show up instead of silently dropping messages
+parse_metrics = MentionParseMetrics()
+
+# One <ResolvedMessage> element: attributes (quoted values may contain '>' or '/>'), then either
+# a self-closing end or content up to the closing tag
+_RESOLVED_MESSAGE = re.compile(
+    r"""<ResolvedMessage\b(?:[^>"'/]|/(?!>)|"[^"]*"|'[^']*')*(?:/>|>.*?</ResolvedMessage>)""", re.DOTALL
+)
+
+
+def _to_message(elem) -> Optional[MentionMessage]:
+    thread_id, sender_id, content = elem.get("threadId"), elem.get("senderId"), elem.get("content")
+    if thread_id and sender_id and content:
+        return MentionMessage(thread_id, sender_id, content)
+    parse_metrics.incomplete += 1
+    return None
+
+
+def _error_offset(response: str, error: ET.ParseError) -> int:
+    """Character offset in response of a parse error; expat reports its column in UTF-8 bytes."""
+    line, column = error.position
+    lines = response.encode("utf-8").split(b"\n")
+    offset = sum(len(l) + 1 for l in lines[:line - 1]) + column
+    return len(response.encode("utf-8")[:offset].decode("utf-8", errors="ignore"))
+
+
+def _salvage(response: str, start: int) -> Iterator[MentionMessage]:
+    # Parse every <ResolvedMessage> fragment that ends after `start` on its own; the ones that
+    # ended before it were already handled by the pull parser
+    for match in _RESOLVED_MESSAGE.finditer(response):
+        if match.end() <= start:
+            continue
+        try:
+            elem = ET.fromstring(match.group(0))
+        except ET.ParseError:
+            parse_metrics.dropped += 1
+            continue
+        message = _to_message(elem)
+        if message is not None:
+            parse_metrics.salvaged += 1
+            parse_metrics.messages += 1
+            yield message
+
+
+def iter_mentions(response: str, chunk_size: int = 64 * 1024) -> Iterator[MentionMessage]:
+    """
+    Incrementally parse a wait_for_mentions response, yielding one message at a time.
+
+    The payload is fed to an XMLPullParser in chunks and each <ResolvedMessage> element is
+    discarded once it has been read, so memory stays flat for large batches. If the payload
+    is malformed, the messages before the error are kept and the rest are salvaged fragment
+    by fragment; every failure is counted in parse_metrics.
+    """
+    if not response or not isinstance(response, str) or "<" not in response:
+        return  # Timeouts and empty responses carry no messages
+    parse_metrics.payloads += 1
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    try:
+        for offset in range(0, len(response) + 1, chunk_size):
+            if offset < len(response):
+                parser.feed(response[offset:offset + chunk_size])
+            else:
+                parser.close()
+            for event, elem in parser.read_events():
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag != "ResolvedMessage":
+                    continue
+                message = _to_message(elem)
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+                if message is not None:
+                    parse_metrics.messages += 1
+                    yield message
+    except ET.ParseError as e:
+        parse_metrics.parse_errors += 1
+        logger.warning(f"Malformed mentions payload ({e}); salvaging the remaining messages")
+        yield from _salvage(response, start=_error_offset(response, e))
+
+
+def parse_mentions_response(response: str) -> List[MentionMessage]:
+    """
+    Parse the XML-like mentions response into a list of MentionMessage records.
+    """
+    try:
+        return list(iter_mentions(response))
+    except Exception as e:
+        parse_metrics.parse_errors += 1
+        logger.error(f"Unexpected parsing error: {str(e)}")
+        return []
+
+
+def format_mention(mention: MentionMessage) -> str:
+    """Render a mention as the human input of an agent run."""
+    return (f"threadId: {mention.thread_id}\n"
+            f"senderId: {mention.sender_id}\n"
+            f"content: {mention.content}")
+
+
+# Tool descriptions, keyed by tool-set fingerprint
+_tool_descriptions: Dict[tuple, str] = {}
+
+
+def _tool_args(tool: Any) -> Any:
+    return tool.args
+
+
+def tools_fingerprint(tools: List[Any], schema: Callable[[Any], Any] = _tool_args) -> tuple:
+    """Identify a tool set by the name, description and schema (as given by `schema`) of each of its tools, in order."""
+    return tuple((tool.name, tool.description, json.dumps(schema(tool), sort_keys=True, default=str)) for tool in tools)
+
+
+def get_tools_description(tools: List[Any], schema: Callable[[Any], Any] = _tool_args) -> str:
+    """
+    Describe the tools for a system prompt, with braces escaped for ChatPromptTemplate.
+
+    `schema` picks what is shown for each tool: its args by default, or e.g.
+    `lambda tool: tool.args_schema` for the full JSON schema including `required`.
+    The description is computed once per tool set and schema, so rebuilding an agent with
+    the same tools does not serialise every schema again.
+    """
+    key = tools_fingerprint(tools, schema)
+    if key not in _tool_descriptions:
+        _tool_descriptions[key] = "\n".join(
+            f"Tool: {tool.name}, Schema: {json.dumps(schema(tool)).replace('{', '{{').replace('}', '}}')}"
+            for tool in tools
+        )
+    return _tool_descriptions[key]
+
+
+class MentionDispatcher:
+    """
+    Run mentions concurrently across threads while keeping each thread's mentions in order.
+
+    Every thread with pending mentions gets its own task that handles them one after another,
+    so a long run in one thread never blocks the others, and a thread never sees its
+    messages handled out of order. At most max_concurrent_threads handlers run at once and
+    at most max_pending mentions are held; dispatch() waits when that many are pending.
+
+    Args:
+        handle: Coroutine handling one mention
+        max_concurrent_threads: Handlers running at the same time
+        max_pending: Mentions accepted but not yet handled, across all threads
+    """
+
+    def __init__(self, handle: Callable[[MentionMessage], Awaitable[Any]], max_concurrent_threads: int = 4, max_pending: int = 100):
+        self.handle = handle
+        self._running = asyncio.Semaphore(max_concurrent_threads)
+        self._pending = asyncio.Semaphore(max_pending)
+        self._queues: Dict[str, deque] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def active_threads(self) -> int:
+        return len(self._tasks)
+
+    async def dispatch(self, mention: MentionMessage):
+        await self._pending.acquire()
+        thread_id = mention.thread_id
+        queue = self._queues.get(thread_id)
+        if queue is None:
+            queue = self._queues[thread_id] = deque()
+            self._tasks[thread_id] = asyncio.create_task(self._drain(thread_id, queue))
+        queue.append(mention)
+
+    async def _drain(self, thread_id: str, queue: deque):
+        try:
+            while queue:
+                mention = queue.popleft()
+                try:
+                    async with self._running:
+                        await self.handle(mention)
+                finally:
+                    self._pending.release()
+        finally:
+            # No await between the empty check and here, so no mention can slip in unnoticed
+            del self._queues[thread_id]
+            del self._tasks[thread_id]
+
+    def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+
+
+# Backoff in seconds after a wait_for_mentions response that returned early without messages
+_MIN_EMPTY_BACKOFF = 1.0
+_MAX_EMPTY_BACKOFF = 30.0
+
+
+class CoralAgentRuntime:
+    """
+    Event-driven main loop for a Coral agent.
+
+    The runtime calls the `wait_for_mentions` coral tool itself instead of asking the LLM to
+    do it, so an idle agent spends no tokens. Mentions are handed to a MentionDispatcher: runs
+    for different threads proceed concurrently (up to max_concurrent_threads) while mentions
+    of the same thread are handled in order. If handling a mention fails, the sender is sent
+    "error" so it never waits forever.
+
+    Args:
+        coral_tools: Tools of the coral MCP server (must include wait_for_mentions and send_message)
+        handle_mention: Coroutine running the agent for one MentionMessage
+        max_concurrent_threads: Threads handled at the same time (default: MAX_CONCURRENT_MENTIONS env var or 4)
+        wait_timeout_ms: timeoutMs passed to wait_for_mentions (default: CORAL_WAIT_TIMEOUT_MS env var or 30000)
+
+    A response without messages that comes back well before the timeout (e.g. an error string
+    instead of the XML payload) is retried with an exponential backoff, so a misbehaving server
+    does not turn the loop into a busy poll.
+    """
+
+    def __init__(self, coral_tools: List[Any], handle_mention: Callable[[MentionMessage], Awaitable[Any]],
+                 max_concurrent_threads: Optional[int] = None, wait_timeout_ms: Optional[int] = None):
+        tools_by_name = {tool.name: tool for tool in coral_tools}
+        self.wait_for_mentions = tools_by_name["wait_for_mentions"]
+        self.send_message = tools_by_name.get("send_message")
+        self.handle_mention = handle_mention
+        self.max_concurrent_threads = max_concurrent_threads or int(os.getenv("MAX_CONCURRENT_MENTIONS", "4"))
+        self.wait_timeout_ms = wait_timeout_ms or int(os.getenv("CORAL_WAIT_TIMEOUT_MS", "30000"))
+
+    async def run(self):
+        dispatcher = MentionDispatcher(self._handle, self.max_concurrent_threads)
+        loop = asyncio.get_running_loop()
+        backoff = 0.0
+        try:
+            while True:
+                started = loop.time()
+                try:
+                    response = await self.wait_for_mentions.ainvoke({"timeoutMs": self.wait_timeout_ms})
+                except Exception as e:
+                    logger.error(f"wait_for_mentions failed: {str(e)}")
+                    await asyncio.sleep(5)
+                    continue
+
+                response = response if isinstance(response, str) else str(response)
+                mentions = parse_mentions_response(response)
+                for mention in mentions:
+                    logger.info(f"Mention received in thread {mention.thread_id} from {mention.sender_id}")
+                    await dispatcher.dispatch(mention)
+
+                elapsed = loop.time() - started
+                if mentions or elapsed >= self.wait_timeout_ms / 2000:
+                    backoff = 0.0
+                    continue
+                backoff = min(max(backoff * 2, _MIN_EMPTY_BACKOFF), _MAX_EMPTY_BACKOFF)
+                logger.warning(f"wait_for_mentions returned no messages after {elapsed:.1f}s "
+                               f"({response[:200]!r}); retrying in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+        finally:
+            dispatcher.close()
+
+    async def _handle(self, mention: MentionMessage):
+        try:
+            await self.handle_mention(mention)
+        except Exception as e:
+            logger.error(f"Error handling mention in thread {mention.thread_id}: {str(e)}")
+            logger.error(traceback.format_exc())
+            await self._reply_error(mention)
+
+    async def _reply_error(self, mention: MentionMessage):
+        if self.send_message is None:
+            return
+        try:
+            await self.send_message.ainvoke({
+                "threadId": mention.thread_id,
+                "content": "error",
+                "mentions": [mention.sender_id],
+            })
+        except Exception as e:
+            logger.error(f"Could not report the error to {mention.sender_id}: {str(e)}")
@@ -0,0 +1,305 @@
+import os
+import asyncio
+import json
+import logging
+import shlex
+import shutil
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from anyio import BrokenResourceError, ClosedResourceError, EndOfStream
+from langchain_core.tools import StructuredTool, ToolException
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import get_default_environment, stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+logger = logging.getLogger(__name__)
+
+# Tools whose results depend only on their arguments, so they can be answered from the cache
+DEFAULT_CACHED_TOOLS = ("firecrawl_scrape", "firecrawl_batch_scrape", "firecrawl_map", "firecrawl_crawl")
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    """Whether a failed call means the worker's connection is gone, as opposed to the tool itself failing."""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (ClosedResourceError, BrokenResourceError, EndOfStream, OSError))
+
+
+class ScrapeCache:
+    """
+    LRU cache of Firecrawl tool results keyed by tool name, URL and options.
+
+    Only successful results are stored; entries expire after ttl seconds.
+
+    Args:
+        max_entries: Least recently used results are evicted beyond this
+        ttl: Seconds a result is served from the cache
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(tool_name: str, arguments: Dict[str, Any]) -> Tuple[str, str]:
+        return tool_name, json.dumps(arguments, sort_keys=True, default=str)
+
+    def get(self, tool_name: str, arguments: Dict[str, Any]) -> Optional[str]:
+        key = self.key(tool_name, arguments)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, tool_name: str, arguments: Dict[str, Any], result: str):
+        key = self.key(tool_name, arguments)
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class FirecrawlWorker:
+    """
+    One long-lived firecrawl-mcp subprocess and its MCP session.
+
+    The stdio transport and session are opened and closed inside a single task (anyio
+    requires their cancel scopes to be exited by the task that entered them); stop() asks
+    that task to shut the worker down.
+    """
+
+    def __init__(self, index: int, params: StdioServerParameters):
+        self.index = index
+        self.params = params
+        self.session: Optional[ClientSession] = None
+        self.healthy = False
+        self.restarts = 0
+        self._stop: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, timeout: float):
+        self._stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._serve(ready, self._stop))
+        try:
+            await asyncio.wait_for(ready, timeout)
+        except BaseException:
+            await self.stop()
+            raise
+
+    async def _serve(self, ready: asyncio.Future, stop: asyncio.Event):
+        try:
+            async with stdio_client(self.params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self.healthy = True
+                    ready.set_result(None)
+                    await stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"Firecrawl worker {self.index} exited: {str(e)}")
+        finally:
+            self.session = None
+            self.healthy = False
+
+    async def stop(self, timeout: float = 10.0):
+        self.healthy = False
+        if self._stop is not None:
+            self._stop.set()
+        task, self._task = self._task, None
+        if task is not None:
+            # asyncio.wait neither cancels the task on timeout nor raises its errors, so a
+            # CancelledError here always means the caller was cancelled
+            try:
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not done:
+                task.cancel()
+
+
+class FirecrawlPool:
+    """
+    Pool of long-lived firecrawl-mcp workers shared by all tool calls of the agent.
+
+    Spawning `npx -y firecrawl-mcp` resolves the package again every time, and one stdio
+    pipe serialises every scrape. The pool starts `size` workers once, dispatches calls to
+    the healthy ones round-robin, pings them every health_interval seconds and restarts the
+    ones that stop answering. A call whose worker connection breaks is retried once on
+    another worker; errors reported by a live worker (e.g. invalid arguments) are returned
+    to the caller and leave the worker in rotation. Results of the cached tools are served from a ScrapeCache.
+
+    Args:
+        params: How to start one worker
+        size: Number of workers
+        cache: Result cache (None disables caching)
+        cached_tools: Names of the tools whose results are cached
+        health_interval: Seconds between health checks
+        call_timeout: Seconds a single tool call may take
+        startup_timeout: Seconds a worker may take to start
+    """
+
+    def __init__(self, params: StdioServerParameters, size: int = 2, cache: Optional[ScrapeCache] = None,
+                 cached_tools: Tuple[str, ...] = DEFAULT_CACHED_TOOLS, health_interval: float = 30.0,
+                 call_timeout: float = 300.0, startup_timeout: float = 120.0):
+        self.params = params
+        self.cache = cache
+        self.cached_tools = set(cached_tools)
+        self.health_interval = health_interval
+        self.call_timeout = call_timeout
+        self.startup_timeout = startup_timeout
+        self.workers = [FirecrawlWorker(i, params) for i in range(size)]
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "FirecrawlPool":
+        """
+        Build the pool from environment variables:
+        FIRECRAWL_MCP_COMMAND and FIRECRAWL_MCP_ARGS (default: a `firecrawl-mcp` found on PATH, else
+        `npx -y firecrawl-mcp`, which resolves the package again for every worker start and restart;
+        pin FIRECRAWL_MCP_COMMAND to an installed binary in production, or use `python stub_firecrawl_mcp.py`
+        for tests), FIRECRAWL_MCP_WORKERS, FIRECRAWL_CACHE_TTL (0 disables the cache) and
+        FIRECRAWL_CACHE_MAX_ENTRIES.
+
+        The command is looked up on PATH once, here, so every worker runs the same binary.
+        """
+        env = get_default_environment()
+        if os.getenv("FIRECRAWL_API_KEY"):
+            env["FIRECRAWL_API_KEY"] = os.getenv("FIRECRAWL_API_KEY")
+        command = os.getenv("FIRECRAWL_MCP_COMMAND")
+        args = os.getenv("FIRECRAWL_MCP_ARGS")
+        if not command:
+            command = shutil.which("firecrawl-mcp")
+            if command is None:
+                logger.warning("firecrawl-mcp is not installed; workers are started through npx, which resolves "
+                               "the package on every start (set FIRECRAWL_MCP_COMMAND to pin the binary)")
+                command = "npx"
+        if args is None:
+            args = "-y firecrawl-mcp" if command == "npx" else ""
+        command = shutil.which(command) or command
+        params = StdioServerParameters(command=command, args=shlex.split(args), env=env)
+        ttl = float(os.getenv("FIRECRAWL_CACHE_TTL") or 24 * 3600)
+        cache = ScrapeCache(int(os.getenv("FIRECRAWL_CACHE_MAX_ENTRIES") or 512), ttl) if ttl > 0 else None
+        return cls(params, size=int(os.getenv("FIRECRAWL_MCP_WORKERS") or 2), cache=cache)
+
+    async def start(self):
+        results = await asyncio.gather(*(w.start(self.startup_timeout) for w in self.workers), return_exceptions=True)
+        for worker, result in zip(self.workers, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Firecrawl worker {worker.index} failed to start: {str(result)}")
+        if not any(w.healthy for w in self.workers):
+            raise RuntimeError("No firecrawl-mcp worker could be started")
+        logger.info(f"Firecrawl pool started with {sum(w.healthy for w in self.workers)}/{len(self.workers)} workers")
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        await asyncio.gather(*(w.stop() for w in self.workers), return_exceptions=True)
+
+    def _pick(self, exclude: Optional[FirecrawlWorker] = None) -> FirecrawlWorker:
+        candidates = [w for w in self.workers if w.healthy and w is not exclude]
+        if not candidates:
+            raise ToolException("No healthy firecrawl-mcp worker is available")
+        worker = candidates[self._next % len(candidates)]
+        self._next += 1
+        return worker
+
+    async def _restart(self, worker: FirecrawlWorker):
+        await worker.stop()
+        worker.restarts += 1
+        try:
+            await worker.start(self.startup_timeout)
+            logger.info(f"Firecrawl worker {worker.index} restarted")
+        except Exception as e:
+            logger.error(f"Firecrawl worker {worker.index} could not be restarted: {str(e)}")
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for worker in self.workers:
+                if worker.healthy:
+                    try:
+                        await asyncio.wait_for(worker.session.send_ping(), timeout=10)
+                        continue
+                    except Exception as e:
+                        logger.warning(f"Firecrawl worker {worker.index} failed its health check: {str(e)}")
+                await self._restart(worker)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        cacheable = self.cache is not None and name in self.cached_tools
+        if cacheable:
+            cached = self.cache.get(name, arguments)
+            if cached is not None:
+                return cached
+
+        worker = self._pick()
+        try:
+            result = await self._call(worker, name, arguments)
+        except ToolException:
+            raise
+        except Exception as e:
+            if not _is_transport_error(e):
+                raise ToolException(f"{name} failed: {str(e)}")
+            # The worker is gone; let the health loop restart it and retry elsewhere
+            logger.warning(f"Firecrawl worker {worker.index} failed on {name}: {str(e)}")
+            worker.healthy = False
+            worker = self._pick(exclude=worker)
+            try:
+                result = await self._call(worker, name, arguments)
+            except ToolException:
+                raise
+            except Exception as e:
+                if _is_transport_error(e):
+                    worker.healthy = False
+                raise ToolException(f"{name} failed: {str(e)}")
+
+        text = "\n".join(c.text if getattr(c, "type", None) == "text" else str(c) for c in result.content)
+        if result.isError:
+            raise ToolException(text)
+        if cacheable:
+            self.cache.put(name, arguments, text)
+        return text
+
+    async def _call(self, worker: FirecrawlWorker, name: str, arguments: Dict[str, Any]):
+        session = worker.session
+        if session is None:
+            raise ClosedResourceError()
+        try:
+            return await asyncio.wait_for(session.call_tool(name, arguments), self.call_timeout)
+        except asyncio.TimeoutError:
+            raise ToolException(f"{name} did not finish within {self.call_timeout:.0f}s")
+
+    async def get_tools(self) -> List[StructuredTool]:
+        """LangChain tools for every tool of the firecrawl MCP server, dispatched through the pool."""
+        listed = await self._pick().session.list_tools()
+        return [self._as_tool(tool) for tool in listed.tools]
+
+    def _as_tool(self, tool) -> StructuredTool:
+        async def call(**arguments):
+            return await self.call_tool(tool.name, arguments)
+
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description or "",
+            args_schema=tool.inputSchema,
+            coroutine=call,
+        )
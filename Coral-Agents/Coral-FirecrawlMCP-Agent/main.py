@@ -5,14 +5,11 @@ from langchain.chat_models import init_chat_model
 from langchain.prompts import ChatPromptTemplate
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.agents import create_tool_calling_agent, AgentExecutor
+from coral_runtime import CoralAgentRuntime, format_mention, get_tools_description
+from firecrawl_pool import FirecrawlPool
+from regulation_corpus import get_regulation_corpus, make_regulation_tools
 
 
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
-
 async def create_agent(coral_tools, agent_tools):
     coral_tools_description = get_tools_description(coral_tools)
     agent_tools_description = get_tools_description(agent_tools)
@@ -21,9 +18,9 @@ async def create_agent(coral_tools, agent_tools):
         (
             "system",
             f"""You are an agent interacting with the tools from Coral Server and having your own tools. Your task is to perform any instructions coming from any agent. 
-            Follow these steps in order:
-            1. Call wait_for_mentions from coral tools (timeoutMs: 30000) to receive mentions from other agents.
-            2. When you receive a mention, keep the thread ID and the sender ID.
+            You are given a message (mention) from another agent. Follow these steps in order:
+            1. Read the message and keep its thread ID and sender ID.
+            2. The content of the message is your instruction.
             3. Take 2 seconds to think about the content (instruction) of the message and check only from the list of your tools available for you to action.
             4. Check the tool schema and make a plan in steps for the task you want to perform.
             5. Only call the tools you need to perform for each step of the plan to complete the instruction in the content.
@@ -31,11 +28,14 @@ async def create_agent(coral_tools, agent_tools):
             7. Use `send_message` from coral tools to send a message in the same thread ID to the sender Id you received the mention from, with content: "answer".
             8. If any error occurs, use `send_message` to send a message in the same thread ID to the sender Id you received the mention from, with content: "error".
             9. Always respond back to the sender agent even if you have no answer or error.
-            9. Wait for 2 seconds and repeat the process from step 1.
+            10. Once the reply is sent, finish.
+
+            For rules, regulations and compliance standards, call `search_regulations` first. Only scrape the web for what the local corpus does not cover, and store the clauses you fetch with `save_regulation`.
 
             These are the list of coral tools: {coral_tools_description}
             These are the list of your tools: {agent_tools_description}"""
                 ),
+                ("human", "{input}"),
                 ("placeholder", "{agent_scratchpad}")
 
     ])
@@ -79,34 +79,33 @@ async def main():
                 "timeout": timeout,
                 "sse_read_timeout": timeout,
             },
-            "firecrawl-mcp": {
-                "transport": "stdio",
-                "command": "npx",
-                "args": ["-y", "firecrawl-mcp"],
-                "env": {"FIRECRAWL_API_KEY": os.getenv("FIRECRAWL_API_KEY")},
-            },
         }
     )
 
+    # Long-lived firecrawl-mcp workers, instead of one stdio pipe spawned through npx
+    firecrawl_pool = FirecrawlPool.from_env()
+    await firecrawl_pool.start()
+
     print("Multi Server Connection Established")
 
     coral_tools = await client.get_tools(server_name="coral")
-    agent_tools = await client.get_tools(server_name="firecrawl-mcp")
+    # Regulations are answered from the local corpus; web research only refreshes it
+    agent_tools = await firecrawl_pool.get_tools() + make_regulation_tools(get_regulation_corpus())
 
     print(f"Coral tools count: {len(coral_tools)} and agent tools count: {len(agent_tools)}")
 
-    agent_executor = await create_agent(coral_tools, agent_tools)
-
-    while True:
-        try:
-            print("Starting new agent invocation")
-            await agent_executor.ainvoke({"agent_scratchpad": []})
-            print("Completed agent invocation, restarting loop")
-            await asyncio.sleep(1)
-        except Exception as e:
-            print(f"Error in agent loop: {str(e)}")
-            print(traceback.format_exc())
-            await asyncio.sleep(5)
+    # The runtime waits for mentions, the LLM only handles them
+    agent_executor = await create_agent([tool for tool in coral_tools if tool.name != "wait_for_mentions"], agent_tools)
+
+    async def handle_mention(mention):
+        print(f"Starting agent invocation for thread {mention.thread_id}")
+        await agent_executor.ainvoke({"input": format_mention(mention), "agent_scratchpad": []})
+        print(f"Completed agent invocation for thread {mention.thread_id}")
+
+    try:
+        await CoralAgentRuntime(coral_tools, handle_mention).run()
+    finally:
+        await firecrawl_pool.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
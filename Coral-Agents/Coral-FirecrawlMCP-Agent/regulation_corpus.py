@@ -0,0 +1,303 @@
+"""
+Local regulation corpus with a full-text index.
+
+Regulation texts (GDPR, HIPAA, PCI-DSS, SOC 2, ...) barely change between assessments, so
+they are ingested once into SQLite and searched with FTS5/BM25 instead of being scraped
+for every request. Web research is only needed to refresh or extend the corpus.
+
+    python regulation_corpus.py ingest regulations/*.md --regulation GDPR --domain privacy
+    python regulation_corpus.py ingest clauses.jsonl
+    python regulation_corpus.py search "encryption of cardholder data" --domain finance
+    python regulation_corpus.py stats
+
+JSON/JSONL records carry regulation, clause, title, text and optionally domains and
+source_url. Markdown and text files are split into one clause per heading, identified
+by its heading path (e.g. "Article 32 > Requirements").
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain_core.tools import tool
+
+# Keywords used to tag clauses with the domains they apply to when no domain is given.
+# They are regulation names and multi-word terms: generic words such as "model" or "token"
+# also occur in ordinary security clauses and would mis-tag them.
+DOMAIN_KEYWORDS: Dict[str, tuple] = {
+    "privacy": ("gdpr", "ccpa", "cpra", "personal data", "personal information", "data subject",
+                "data protection", "privacy notice", "right to erasure"),
+    "healthcare": ("hipaa", "hitech", "phi", "protected health information", "health data",
+                   "health information", "medical record", "medical records", "covered entity", "covered entities"),
+    "finance": ("pci", "pci dss", "pci-dss", "cardholder data", "payment card", "sox", "sarbanes-oxley",
+                "financial reporting", "anti-money laundering", "aml", "kyc", "know your customer"),
+    "security": ("soc 2", "soc2", "iso 27001", "iso/iec 27001", "nist csf", "access control",
+                 "encryption", "security incident", "vulnerability management"),
+    "ai": ("ai act", "artificial intelligence", "machine learning", "automated decision-making",
+           "automated decision", "high-risk ai", "ai system", "ai systems"),
+    "blockchain": ("mica", "crypto-asset", "crypto-assets", "crypto asset", "crypto assets", "cryptocurrency",
+                   "blockchain", "distributed ledger", "virtual asset", "virtual assets", "stablecoin"),
+}
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*$", re.MULTILINE)
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+_DOMAIN_PATTERNS = {
+    domain: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b", re.IGNORECASE)
+    for domain, keywords in DOMAIN_KEYWORDS.items()
+}
+
+
+def tag_domains(*texts: str) -> List[str]:
+    """Domains whose keywords appear in the given texts."""
+    text = " ".join(texts)
+    return [domain for domain, pattern in _DOMAIN_PATTERNS.items() if pattern.search(text)]
+
+
+def to_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every term quoted (no syntax errors), any term may match."""
+    terms = [t for t in _TERM.findall(query.lower()) if len(t) > 1]
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+class RegulationCorpus:
+    """
+    Regulation clauses in SQLite with an FTS5 index ranked by BM25.
+
+    Clauses are unique per (regulation, clause); ingesting one again replaces it, which is
+    how the corpus is refreshed. Matches in the regulation name and clause title weigh
+    more than matches in the body.
+
+    Args:
+        path: SQLite database file, or None to keep the corpus in memory
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS clauses (
+                id INTEGER PRIMARY KEY,
+                regulation TEXT NOT NULL,
+                clause TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                text TEXT NOT NULL,
+                domains TEXT NOT NULL DEFAULT '',
+                source_url TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (regulation, clause)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS clauses_fts USING fts5(
+                regulation, title, text, domains,
+                content='clauses', content_rowid='id', tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS clauses_ai AFTER INSERT ON clauses BEGIN
+                INSERT INTO clauses_fts (rowid, regulation, title, text, domains)
+                VALUES (new.id, new.regulation, new.title, new.text, new.domains);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clauses_ad AFTER DELETE ON clauses BEGIN
+                INSERT INTO clauses_fts (clauses_fts, rowid, regulation, title, text, domains)
+                VALUES ('delete', old.id, old.regulation, old.title, old.text, old.domains);
+            END;
+            CREATE TRIGGER IF NOT EXISTS clauses_au AFTER UPDATE ON clauses BEGIN
+                INSERT INTO clauses_fts (clauses_fts, rowid, regulation, title, text, domains)
+                VALUES ('delete', old.id, old.regulation, old.title, old.text, old.domains);
+                INSERT INTO clauses_fts (rowid, regulation, title, text, domains)
+                VALUES (new.id, new.regulation, new.title, new.text, new.domains);
+            END;
+            """
+        )
+
+    def upsert(self, regulation: str, clause: str, text: str, title: str = "",
+               domains: Optional[Iterable[str]] = None, source_url: Optional[str] = None):
+        """Add a clause, or replace the stored clause with the same regulation and clause id."""
+        domains = sorted(set(domains or tag_domains(regulation, title, text)))
+        with self._lock, self._db:
+            self._db.execute(
+                """INSERT INTO clauses (regulation, clause, title, text, domains, source_url, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (regulation, clause) DO UPDATE SET
+                       title = excluded.title, text = excluded.text, domains = excluded.domains,
+                       source_url = excluded.source_url, updated_at = excluded.updated_at""",
+                (regulation, clause, title, text, " ".join(domains), source_url, time.time()),
+            )
+
+    def search(self, query: str, domain: Optional[str] = None, limit: int = 5) -> List[Dict]:
+        """Clauses matching the query, best BM25 score first, optionally limited to one domain."""
+        match = to_match_query(query)
+        if not match:
+            return []
+        if domain:
+            # Quoted as an FTS5 string; embedded quotes are doubled so the domain cannot break the query
+            quoted = domain.lower().replace('"', '""')
+            match = f'domains : "{quoted}" AND ({match})'
+        with self._lock:
+            rows = self._db.execute(
+                """SELECT c.regulation, c.clause, c.title, c.text, c.domains, c.source_url,
+                          bm25(clauses_fts, 4.0, 2.0, 1.0, 0.5) AS score
+                   FROM clauses_fts JOIN clauses c ON c.id = clauses_fts.rowid
+                   WHERE clauses_fts MATCH ?
+                   ORDER BY score LIMIT ?""",
+                (match, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT regulation, COUNT(*) AS n FROM clauses GROUP BY regulation").fetchall()
+        return {row["regulation"]: row["n"] for row in rows}
+
+    def close(self):
+        self._db.close()
+
+
+def iter_records(path: str, regulation: Optional[str] = None) -> Iterator[Dict]:
+    """Read clause records from a JSON, JSONL, Markdown or text file."""
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".jsonl"):
+        for line in content.splitlines():
+            if line.strip():
+                yield json.loads(line)
+        return
+    if path.endswith(".json"):
+        data = json.loads(content)
+        yield from (data if isinstance(data, list) else [data])
+        return
+
+    regulation = regulation or os.path.splitext(os.path.basename(path))[0]
+    headings = list(_HEADING.finditer(content))
+    if not headings:
+        yield {"regulation": regulation, "clause": "full text", "title": regulation, "text": content.strip()}
+        return
+    # Headings repeat within a file (e.g. several "Requirements"), so a clause is identified by
+    # its heading path, with an ordinal for the rare path that still repeats
+    heading_path: List[tuple] = []
+    seen: Dict[str, int] = {}
+    for i, heading in enumerate(headings):
+        level, title = len(heading.group(1)), heading.group(2)
+        while heading_path and heading_path[-1][0] >= level:
+            heading_path.pop()
+        heading_path.append((level, title))
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        text = content[heading.end():end].strip()
+        if not text:
+            continue
+        clause = " > ".join(t for _, t in heading_path)
+        seen[clause] = seen.get(clause, 0) + 1
+        if seen[clause] > 1:
+            clause = f"{clause} ({seen[clause]})"
+        yield {"regulation": regulation, "clause": clause, "title": title, "text": text}
+
+
+def ingest(corpus: RegulationCorpus, paths: List[str], regulation: Optional[str] = None,
+           domains: Optional[List[str]] = None) -> int:
+    count = 0
+    for path in paths:
+        for record in iter_records(path, regulation):
+            corpus.upsert(
+                regulation=record.get("regulation") or regulation or "unknown",
+                clause=str(record.get("clause") or record.get("title") or count),
+                text=record["text"],
+                title=record.get("title", ""),
+                domains=record.get("domains") or domains,
+                source_url=record.get("source_url"),
+            )
+            count += 1
+    return count
+
+
+def format_results(results: List[Dict], max_chars: int = 1500) -> str:
+    if not results:
+        return "No matching clauses in the local regulation corpus."
+    blocks = []
+    for r in results:
+        text = r["text"] if len(r["text"]) <= max_chars else r["text"][:max_chars].rstrip() + " ..."
+        source = f"\nSource: {r['source_url']}" if r["source_url"] else ""
+        blocks.append(f"[{r['regulation']} - {r['clause']}] (domains: {r['domains'] or 'none'})\n{text}{source}")
+    return "\n\n".join(blocks)
+
+
+_corpus: Optional[RegulationCorpus] = None
+
+
+def get_regulation_corpus() -> RegulationCorpus:
+    """Return the corpus stored at REGULATION_CORPUS_PATH (default: data/regulations.db)."""
+    global _corpus
+    if _corpus is None:
+        _corpus = RegulationCorpus(os.getenv("REGULATION_CORPUS_PATH") or os.path.join(os.getcwd(), "data", "regulations.db"))
+    return _corpus
+
+
+def make_regulation_tools(corpus: RegulationCorpus) -> list:
+    """Agent tools to query the corpus and to store freshly scraped regulation text in it."""
+    @tool
+    def search_regulations(query: str, domain: Optional[str] = None, limit: int = 5) -> str:
+        """
+        Search the local regulation corpus (GDPR, HIPAA, PCI-DSS, SOC 2, ...) and return the most relevant clauses.
+        Use this before scraping the web for rules, regulations or compliance standards.
+
+        Args:
+            query: What to look for, e.g. "storage of cardholder data"
+            domain: Optional domain filter: privacy, healthcare, finance, security, ai or blockchain
+            limit: Maximum number of clauses to return
+        """
+        return format_results(corpus.search(query, domain, limit))
+
+    @tool
+    def save_regulation(regulation: str, clause: str, text: str, source_url: Optional[str] = None) -> str:
+        """
+        Store a regulation clause fetched from the web in the local corpus, replacing any older version of it.
+
+        Args:
+            regulation: Name of the regulation, e.g. "GDPR"
+            clause: Clause identifier, e.g. "Article 32"
+            text: Text of the clause
+            source_url: Page the text was taken from
+        """
+        corpus.upsert(regulation, clause, text, title=clause, source_url=source_url)
+        return f"Stored {regulation} {clause} in the regulation corpus."
+
+    return [search_regulations, save_regulation]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local regulation corpus")
+    parser.add_argument("--db", default=None, help="Corpus database (default: REGULATION_CORPUS_PATH or data/regulations.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = commands.add_parser("ingest", help="Add or refresh clauses from JSON, JSONL, Markdown or text files")
+    ingest_parser.add_argument("paths", nargs="+")
+    ingest_parser.add_argument("--regulation", help="Regulation name for Markdown/text files (default: file name)")
+    ingest_parser.add_argument("--domain", action="append", help="Domain tag (repeatable; default: inferred)")
+
+    search_parser = commands.add_parser("search", help="Search the corpus")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--domain")
+    search_parser.add_argument("--limit", type=int, default=5)
+
+    commands.add_parser("stats", help="Number of clauses per regulation")
+
+    args = parser.parse_args()
+    corpus = RegulationCorpus(args.db) if args.db else get_regulation_corpus()
+    if args.command == "ingest":
+        print(f"Ingested {ingest(corpus, args.paths, args.regulation, args.domain)} clauses")
+    elif args.command == "search":
+        print(format_results(corpus.search(args.query, args.domain, args.limit)))
+    else:
+        for regulation, count in sorted(corpus.stats().items()):
+            print(f"{regulation}: {count} clauses")
+    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
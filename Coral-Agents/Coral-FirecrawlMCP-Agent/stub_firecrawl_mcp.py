@@ -0,0 +1,54 @@
+"""
+Local stand-in for firecrawl-mcp, for tests and offline development.
+
+It speaks MCP over stdio and exposes the main Firecrawl tools with deterministic fake
+content, so the agent and FirecrawlPool can run without npm, network access or an API key:
+
+    FIRECRAWL_MCP_COMMAND=python FIRECRAWL_MCP_ARGS="stub_firecrawl_mcp.py" uv run python main.py
+
+STUB_FIRECRAWL_DELAY adds a delay in seconds to every call, to exercise concurrency.
+"""
+import asyncio
+import os
+from typing import List, Optional
+
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("firecrawl-stub")
+DELAY = float(os.getenv("STUB_FIRECRAWL_DELAY", "0"))
+
+
+def _page(url: str) -> str:
+    return f"# Stub page for {url}\n\nThis content was produced by stub_firecrawl_mcp.py (pid {os.getpid()})."
+
+
+@mcp.tool()
+async def firecrawl_scrape(url: str, formats: Optional[List[str]] = None, onlyMainContent: bool = True) -> str:
+    """Scrape a single webpage and return its content as markdown."""
+    await asyncio.sleep(DELAY)
+    return _page(url)
+
+
+@mcp.tool()
+async def firecrawl_map(url: str, limit: int = 10) -> str:
+    """Discover the URLs of a website."""
+    await asyncio.sleep(DELAY)
+    return "\n".join(f"{url.rstrip('/')}/page-{i}" for i in range(1, limit + 1))
+
+
+@mcp.tool()
+async def firecrawl_crawl(url: str, limit: int = 5, maxDepth: int = 2) -> str:
+    """Crawl a website and return the content of its pages."""
+    await asyncio.sleep(DELAY)
+    return "\n\n".join(_page(f"{url.rstrip('/')}/page-{i}") for i in range(1, limit + 1))
+
+
+@mcp.tool()
+async def firecrawl_search(query: str, limit: int = 5) -> str:
+    """Search the web and return matching results."""
+    await asyncio.sleep(DELAY)
+    return "\n".join(f"- https://example.com/{i} : result {i} for {query}" for i in range(1, limit + 1))
+
+
+if __name__ == "__main__":
+    mcp.run()
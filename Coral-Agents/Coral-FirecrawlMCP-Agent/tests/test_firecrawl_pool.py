@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from langchain_core.tools import ToolException
+from mcp import StdioServerParameters
+from mcp.client.stdio import get_default_environment
+
+from firecrawl_pool import FirecrawlPool, FirecrawlWorker, ScrapeCache
+
+STUB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stub_firecrawl_mcp.py")
+
+
+def stub_params() -> StdioServerParameters:
+    env = get_default_environment()
+    env["PYTHONPATH"] = os.pathsep.join(sys.path)
+    return StdioServerParameters(command=sys.executable, args=[STUB], env=env)
+
+
+def stub_pid(text: str) -> str:
+    return text.rsplit("(pid ", 1)[1].rstrip(").")
+
+
+def test_pool_round_robins_and_caches_against_the_stub_server():
+    async def run():
+        pool = FirecrawlPool(stub_params(), size=2, cache=ScrapeCache(), startup_timeout=60)
+        await pool.start()
+        try:
+            tools = {tool.name: tool for tool in await pool.get_tools()}
+            assert {"firecrawl_scrape", "firecrawl_map", "firecrawl_search"} <= set(tools)
+
+            first = await tools["firecrawl_scrape"].ainvoke({"url": "https://a.example"})
+            second = await tools["firecrawl_scrape"].ainvoke({"url": "https://b.example"})
+            assert "Stub page for https://a.example" in first
+            assert stub_pid(first) != stub_pid(second)
+
+            assert await pool.call_tool("firecrawl_scrape", {"url": "https://a.example"}) == first
+            assert pool.cache.stats()["hits"] == 1
+            # Search results are not cached
+            await pool.call_tool("firecrawl_search", {"query": "coral"})
+            assert pool.cache.stats()["entries"] == 2
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_call_fails_over_when_a_worker_connection_breaks():
+    async def run():
+        pool = FirecrawlPool(stub_params(), size=2, cache=None, health_interval=3600, startup_timeout=60)
+        await pool.start()
+        try:
+            broken = pool._pick()
+            await broken.stop()
+            broken.healthy = True  # Not yet noticed by the health loop
+            pool._next -= 1
+            result = await pool.call_tool("firecrawl_scrape", {"url": "https://a.example"})
+            assert "Stub page" in result
+            assert not broken.healthy
+            with pytest.raises(ToolException):
+                await pool.call_tool("firecrawl_scrape", {})  # Missing url: the tool fails, the worker stays
+            assert sum(w.healthy for w in pool.workers) == 1
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+
+
+def test_stop_reraises_the_callers_cancellation():
+    async def run():
+        worker = FirecrawlWorker(0, stub_params())
+        await worker.start(timeout=60)
+        task = worker._task
+        stopping = asyncio.create_task(worker.stop())
+        await asyncio.sleep(0)
+        stopping.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stopping
+        await asyncio.gather(task, return_exceptions=True)
+        assert task.done()
+        assert not worker.healthy
+
+    asyncio.run(run())
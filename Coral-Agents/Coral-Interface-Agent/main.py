@@ -9,6 +9,7 @@ from langchain.tools import Tool
 import logging
 import traceback
 from pydantic import BaseModel
+from utils.coral_config import get_tools_description
 
 
 logging.basicConfig(level=logging.INFO)
@@ -19,12 +20,6 @@ logger = logging.getLogger(__name__)
 class AskHumanInput(BaseModel):
     question: str
 
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
-
 async def ask_human_tool(question: str) -> str:
     print(f"Agent asks: {question}")
     response = input("Your response: ")
@@ -10,12 +10,15 @@ from langchain.prompts import ChatPromptTemplate
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from inputimeout import inputimeout, TimeoutOccurred
+from utils.coral_config import get_tools_description
+from utils.memory import ConversationMemory
 
 
 REQUEST_QUESTION_TOOL = "request-question"
 ANSWER_QUESTION_TOOL = "answer-question"
 WAIT_FOR_MENTIONS_TOOL = "wait-for-mentions"
 MAX_CHAT_HISTORY = 3
+CHAT_HISTORY_TOKEN_BUDGET = 2000
 DEFAULT_TEMPERATURE = 0.0
 DEFAULT_MAX_TOKENS = 8000
 SLEEP_INTERVAL = 1
@@ -54,23 +57,6 @@ def load_config() -> Dict[str, Any]:
     
     return config
 
-def get_tools_description(tools: List[Any]) -> str:
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
-
-def format_chat_history(chat_history: List[Dict[str, str]]) -> str:
-    if not chat_history:
-        return "No previous chat history available."
-    
-    history_str = "Previous Conversations (use this to resolve ambiguous references like 'it'):\n"
-    for i, chat in enumerate(chat_history, 1):
-        history_str += f"Conversation {i}:\n"
-        history_str += f"User: {chat['user_input']}\n"
-        history_str += f"Agent: {chat['response']}\n\n"
-    return history_str
-
 async def get_user_input(runtime: str | None, agent_tools: Dict[str, Any]) -> str:
     user_input = None
 
@@ -203,7 +189,7 @@ async def main():
         agent_executor = await create_agent(coral_tools)
         logger.info("Agent executor created")
 
-        chat_history: List[Dict[str, str]] = []
+        chat_history = ConversationMemory(max_recent_turns=MAX_CHAT_HISTORY, token_budget=CHAT_HISTORY_TOKEN_BUDGET)
 
         while True:
             try:
@@ -211,7 +197,7 @@ async def main():
                 if not user_input or "no new messages" in str(user_input).lower():
                     continue
                 
-                formatted_history = format_chat_history(chat_history)                
+                formatted_history = chat_history.render()
                 result = await agent_executor.ainvoke({
                     "user_input": user_input,
                     "agent_scratchpad": [],
@@ -221,9 +207,7 @@ async def main():
                 
                 await send_response(config["runtime"], agent_tools, response)
 
-                chat_history.append({"user_input": user_input, "response": response})
-                if len(chat_history) > MAX_CHAT_HISTORY:
-                    chat_history.pop(0)
+                chat_history.add(user_input, response)
                 
                 await asyncio.sleep(SLEEP_INTERVAL)
             except Exception as e:
@@ -1,7 +1,6 @@
 import os
 import logging
 import json
-import xml.etree.ElementTree as ET
 from typing import List, Dict, Any
 from dotenv import load_dotenv
 
@@ -42,40 +41,27 @@ def load_config() -> Dict[str, Any]:
     # logger.info("Configuration loaded")
     return config
 
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
+# Tool descriptions, keyed by tool-set fingerprint
+_tool_descriptions: Dict[tuple, str] = {}
 
-def parse_mentions_response(response: str) -> List[Dict[str, str]]:
+def tools_fingerprint(tools: List[Any]) -> tuple:
+    """Identify a tool set by the name, description and args schema of each of its tools, in order."""
+    return tuple((tool.name, tool.description, json.dumps(tool.args, sort_keys=True, default=str)) for tool in tools)
+
+def get_tools_description(tools: List[Any]) -> str:
     """
-    Parse the XML-like mentions response into a list of message dictionaries.
+    Describe the tools for a system prompt, with braces escaped for ChatPromptTemplate.
+
+    The description is computed once per tool set, so rebuilding an agent with the same
+    tools does not serialise every schema again.
     """
-    try:
-        if not response or not isinstance(response, str):
-            logger.info("Empty or non-string mentions response")
-            return []
-        
-        root = ET.fromstring(response)
-        messages = []
-        
-        for msg in root.findall(".//ResolvedMessage"):
-            message = {
-                "threadId": msg.get("threadId"),
-                "senderId": msg.get("senderId"),
-                "content": msg.get("content")
-            }
-            if all(message.values()):
-                messages.append(message)
-        
-        # logger.info(f"Parsed {len(messages)} messages")
-        return messages
-    except ET.ParseError as e:
-        return []
-    except Exception as e:
-        logger.error(f"Unexpected parsing error: {str(e)}")
-        return []
+    key = tools_fingerprint(tools)
+    if key not in _tool_descriptions:
+        _tool_descriptions[key] = "\n".join(
+            f"Tool: {tool.name}, Schema: {json.dumps(tool.args).replace('{', '{{').replace('}', '}}')}"
+            for tool in tools
+        )
+    return _tool_descriptions[key]
 
 def mcp_resources_details(resources):
     results = []
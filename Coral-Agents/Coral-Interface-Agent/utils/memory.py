@@ -0,0 +1,120 @@
+import re
+from collections import deque
+from typing import Deque, List, Optional
+
+HISTORY_HEADER = "Previous Conversations (use this to resolve ambiguous references like 'it'):\n"
+SUMMARY_HEADER = "Earlier conversations (summarised):\n"
+EMPTY_HISTORY = "No previous chat history available."
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " ...[truncated]"
+
+def summarise(text: str, max_tokens: int) -> str:
+    """Extractive summary: the leading sentences of the text that fit in max_tokens."""
+    # Only the head of the text can end up in the summary, so long reports are not scanned in full
+    text = " ".join(text[:max_tokens * 16].split())
+    summary = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{summary} {sentence}".strip()
+        if estimate_tokens(candidate) > max_tokens:
+            break
+        summary = candidate
+    return summary or truncate_to_tokens(text, max_tokens)
+
+class _Turn:
+    __slots__ = ("number", "block", "tokens")
+
+    def __init__(self, number: int, block: str):
+        self.number = number
+        self.block = block
+        self.tokens = estimate_tokens(block)
+
+class ConversationMemory:
+    """
+    Bounded chat history for the agent prompt.
+
+    The last max_recent_turns turns are kept verbatim (each message capped at
+    max_response_tokens, so a whole report never lands in the prompt). Older turns are
+    summarised once, when they leave the recent window, and the summary is kept instead.
+    Whenever the history exceeds token_budget, recent turns are summarised early (all but
+    the latest) and then the oldest summaries are dropped.
+
+    Every turn is rendered to text once, when it is added or summarised, and the history
+    string is rebuilt only when a turn is added, so rendering stays cheap and the prompt
+    stays the same size however long the session or its reports get.
+
+    Args:
+        max_recent_turns: Turns kept verbatim
+        token_budget: Upper bound on the estimated tokens of the rendered history
+        max_response_tokens: Cap on each verbatim response
+        summary_tokens: Size of the summary kept for an older turn
+    """
+
+    def __init__(self, max_recent_turns: int = 3, token_budget: int = 2000,
+                 max_response_tokens: int = 400, summary_tokens: int = 80):
+        self.max_recent_turns = max_recent_turns
+        self.token_budget = token_budget
+        self.max_response_tokens = max_response_tokens
+        self.summary_tokens = summary_tokens
+        self._recent: Deque[tuple] = deque()
+        self._summaries: Deque[_Turn] = deque()
+        self._turns = 0
+        self._tokens = 0
+        self._rendered: Optional[str] = EMPTY_HISTORY
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._summaries)
+
+    @property
+    def tokens(self) -> int:
+        """Estimated tokens of the rendered history."""
+        return self._tokens
+
+    def add(self, user_input: str, response: str):
+        self._turns += 1
+        block = (f"Conversation {self._turns}:\n"
+                 f"User: {truncate_to_tokens(user_input, self.max_response_tokens)}\n"
+                 f"Agent: {truncate_to_tokens(response, self.max_response_tokens)}\n\n")
+        turn = _Turn(self._turns, block)
+        self._recent.append((turn, user_input, response))
+        self._tokens += turn.tokens
+
+        # Past the budget, older recent turns are summarised early; the latest stays verbatim
+        while len(self._recent) > self.max_recent_turns or (self._tokens > self.token_budget and len(self._recent) > 1):
+            old, old_input, old_response = self._recent.popleft()
+            summary = _Turn(old.number, (f"- Conversation {old.number}: "
+                                         f"User: {summarise(old_input, self.summary_tokens // 2)} "
+                                         f"Agent: {summarise(old_response, self.summary_tokens)}\n"))
+            self._summaries.append(summary)
+            self._tokens += summary.tokens - old.tokens
+
+        while self._summaries and self._tokens > self.token_budget:
+            self._tokens -= self._summaries.popleft().tokens
+        self._rendered = None
+
+    def render(self) -> str:
+        """The history as prompt text."""
+        if self._rendered is None:
+            parts: List[str] = [HISTORY_HEADER]
+            if self._summaries:
+                parts.append(SUMMARY_HEADER)
+                parts.extend(turn.block for turn in self._summaries)
+                parts.append("\n")
+            parts.extend(turn.block for turn, _, _ in self._recent)
+            self._rendered = "".join(parts)
+        return self._rendered
+
+    def clear(self):
+        self._recent.clear()
+        self._summaries.clear()
+        self._tokens = 0
+        self._rendered = EMPTY_HISTORY
@@ -9,6 +9,8 @@ from dotenv import load_dotenv
 from anyio import ClosedResourceError
 import urllib.parse
 from odr import OpenDeepResearch 
+from report_store import get_report_store
+from coral_runtime import CoralAgentRuntime, format_mention, get_tools_description
 import tempfile
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,33 +18,40 @@ logger = logging.getLogger(__name__)
 
 async def odr_tool_async(topic: str):
     research = OpenDeepResearch()
-    report = await research.generate_research_report(topic)
-    temp_dir = os.path.join(os.getcwd(), "temp")
-    os.makedirs(temp_dir, exist_ok=True)
-    report_path = os.path.join(temp_dir, "report.txt")
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write(report)
-    return (report, {"report_content": report, "report_path": report_path})
-
-def get_tools_description(tools):
-    return "\n".join(
-        f"Tool: {tool.name}, Schema: {json.dumps(tool.args_schema).replace('{', '{{').replace('}', '}}')}"
-        for tool in tools
-    )
+    store = get_report_store()
+    report_id = store.new_report_id()
+    partial_path = store.partial_path(report_id)
+    # Sections are appended to the partial report as soon as they are ready, in plan order
+    try:
+        report = await research.generate_research_report(
+            topic,
+            report_path=partial_path,
+            on_section=lambda section: logger.info(f"Report section ready: {section.name} ({partial_path})"),
+            thread_id=report_id,
+        )
+    except BaseException:
+        store.discard(report_id)
+        raise
+    handle = store.write(report_id, report)
+    return (report, {"report_content": report, "report_id": handle.report_id, "report_path": handle.path})
+
+def _args_schema(tool):
+    # The full JSON schema, so the prompt shows which arguments are required
+    return tool.args_schema
 
 async def create_agent(coral_tools, agent_tools):
-    coral_tools_description = get_tools_description(coral_tools)
-    agent_tools_description = get_tools_description(agent_tools)
+    coral_tools_description = get_tools_description(coral_tools, schema=_args_schema)
+    agent_tools_description = get_tools_description(agent_tools, schema=_args_schema)
     combined_tools = coral_tools + agent_tools
 
     prompt = ChatPromptTemplate.from_messages([
         (
             "system",
             f"""You are a specialized research agent interacting with the tools from Coral Server and having your own tools. Your task is to perform any instructions coming from any agent.
-                Follow these steps in order:
+                You are given a message (mention) from another agent. Follow these steps in order:
 
-                1. Call wait_for_mentions from coral tools (timeoutMs: 30000) to receive mentions from other agents.
-                2. When you receive a mention, keep the thread ID and the sender ID.
+                1. Read the message and keep its thread ID and sender ID.
+                2. The content of the message is your instruction.
                 3. Think about the content (instruction) of the message and check only from the list of your tools available for you to action.
                 4. Check the tool schema and make a plan in steps for the task you want to perform.
                 5. Only call the tools you need to perform for each step of the plan to complete the instruction in the content.
@@ -50,11 +59,12 @@ async def create_agent(coral_tools, agent_tools):
                 7. Use send_message from coral tools to send a message in the same thread ID to the sender Id you received the mention from, with content: "answer" containing the report content and the file path where the report is saved.
                 8. If any error occurs, use send_message to send a message in the same thread ID to the sender Id you received the mention from, with content: "error".
                 9. Always respond back to the sender agent even if you have no answer or error.
-                10. Repeat the process from step 1.
+                10. Once the reply is sent, finish.
 
             These are the list of coral tools: {coral_tools_description}
             These are the list of your tools: {agent_tools_description}."""
         ),
+        ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}")
     ])
 
@@ -110,7 +120,7 @@ async def main():
             name="open_deepresearch",
             func=None,
             coroutine=odr_tool_async,
-            description="Generates a comprehensive research report on a given topic using OpenDeepResearch. Saves the report to a temporary directory as report.txt and returns the complete research report content along with the file path.",
+            description="Generates a comprehensive research report on a given topic using OpenDeepResearch. Saves the report under a unique report id in the report store and returns the complete research report content along with the file path.",
             args_schema={
                 "properties": {
                     "topic": {
@@ -125,18 +135,15 @@ async def main():
         )
     ]
     
-    agent_executor = await create_agent(coral_tools, agent_tools)
-
-    while True:
-        try:
-            logger.info("Starting new agent invocation")
-            await agent_executor.ainvoke({"agent_scratchpad": []})
-            logger.info("Completed agent invocation, restarting loop")
-            await asyncio.sleep(1)
-        except Exception as e:
-            logger.error(f"Error in agent loop: {str(e)}")
-            logger.error(traceback.format_exc())
-            await asyncio.sleep(5)
+    # The runtime waits for mentions, the LLM only handles them
+    agent_executor = await create_agent([tool for tool in coral_tools if tool.name != "wait_for_mentions"], agent_tools)
+
+    async def handle_mention(mention):
+        logger.info(f"Starting agent invocation for thread {mention.thread_id}")
+        await agent_executor.ainvoke({"input": format_mention(mention), "agent_scratchpad": []})
+        logger.info(f"Completed agent invocation for thread {mention.thread_id}")
+
+    await CoralAgentRuntime(coral_tools, handle_mention).run()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
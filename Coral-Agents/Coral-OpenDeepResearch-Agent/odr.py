@@ -7,6 +7,7 @@ from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import Command
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "open_deep_research")))
 from open_deep_research.graph import builder
+from open_deep_research.report_assembler import ReportAssembler
 
 runtime = os.getenv("CORAL_ORCHESTRATION_RUNTIME", "devmode")
 if runtime == "devmode":
@@ -18,6 +19,18 @@ if not os.environ.get("LINKUP_API_KEY"):
 if "MISTRAL_API_KEY" not in os.environ:
     raise ValueError("This agent requires MISTRAL_API_KEY to be set")
 
+# The graph is compiled once per process. Thread state only lives in the checkpointer
+# while a report is being generated and is purged as soon as the report is extracted.
+_memory = MemorySaver()
+_graph = None
+
+def get_graph():
+    """Return the process-wide compiled research graph."""
+    global _graph
+    if _graph is None:
+        _graph = builder.compile(checkpointer=_memory)
+    return _graph
+
 
 class OpenDeepResearch:
     def __init__(self):
@@ -33,15 +46,21 @@ class OpenDeepResearch:
         - Aim for 1 structural element (either a list or table) that distills the main body sections 
         - Provide a concise summary of the report"""
 
-    async def generate_research_report(self, topic: str):
-        # Setup memory + graph
-        memory = MemorySaver()
-        graph = builder.compile(checkpointer=memory)
+    async def generate_research_report(self, topic: str, report_path: str = None, on_section=None, thread_id: str = None):
+        """
+        Run the research graph for a topic and return the final report.
+
+        Sections are emitted in plan order as soon as they and all their predecessors are
+        finished: appended to report_path (if given) and passed to on_section (sync or async).
+        Concurrent calls are independent as long as each uses its own thread_id (default: a new uuid).
+        """
+        graph = get_graph()
 
         # Thread config
+        thread_id = thread_id or str(uuid.uuid4())
         thread = {
             "configurable": {
-                "thread_id": str(uuid.uuid4()),
+                "thread_id": thread_id,
                 "search_api": "linkup",
                 "planner_provider": "mistralai",
                 "planner_model": "mistral-large-latest",
@@ -52,19 +71,29 @@ class OpenDeepResearch:
             }
         }
 
-        # Step 1: Run graph with the topic
-        async for _ in graph.astream({"topic": topic}, thread, stream_mode="updates"):
-            pass
+        try:
+            # Step 1: Run graph with the topic
+            sections = []
+            async for update in graph.astream({"topic": topic}, thread, stream_mode="updates"):
+                plan = update.get("generate_report_plan")
+                if plan:
+                    sections = plan["sections"]
 
-        # Step 2: Resume automatically (like skipping feedback)
-        async for _ in graph.astream(Command(resume=True), thread, stream_mode="updates"):
-            print(_)
-            print("\n")
-            pass
+            # Step 2: Resume automatically (like skipping feedback), emitting sections as they complete
+            assembler = ReportAssembler(sections, path=report_path, on_section=on_section)
+            async for update in graph.astream(Command(resume=True), thread, stream_mode="updates"):
+                print(update)
+                print("\n")
+                for node in ("build_section_with_web_research", "write_final_sections"):
+                    for section in (update.get(node) or {}).get("completed_sections", []):
+                        await assembler.add(section)
 
-        # Step 3: Get final report
-        final_state = graph.get_state(thread)
-        report = final_state.values.get("final_report")
+            # Step 3: Get final report
+            final_state = await graph.aget_state(thread)
+            report = final_state.values.get("final_report")
+        finally:
+            # Drop the thread's checkpoints so memory stays flat across research runs
+            _memory.delete_thread(thread_id)
         
         # Check if report was generated successfully
         if not report:
@@ -72,6 +101,19 @@ class OpenDeepResearch:
 
         return report
 
+    async def stream_research_report(self, topic: str, report_path: str = None):
+        """Async iterator over the report sections, in plan order, as they become available."""
+        queue = asyncio.Queue()
+        task = asyncio.create_task(self.generate_research_report(topic, report_path, on_section=queue.put_nowait))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (section := await queue.get()) is not None:
+                yield section
+            # Surface any error raised while generating the report
+            await task
+        finally:
+            task.cancel()
+
 if __name__ == "__main__":
     topic = "What is Model Context Protocol?"
     research = OpenDeepResearch()
@@ -1,7 +1,10 @@
 import os
+import json
+import threading
+from collections import OrderedDict
 from enum import Enum
 from dataclasses import dataclass, fields
-from typing import Any, Optional, Dict 
+from typing import Any, Optional, Dict, Union, get_args, get_origin, get_type_hints
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.runnables import RunnableConfig
@@ -28,6 +31,8 @@ class SearchAPI(Enum):
     LINKUP = "linkup"
     DUCKDUCKGO = "duckduckgo"
     GOOGLESEARCH = "googlesearch"
+    AZUREAISEARCH = "azureaisearch"
+    FANOUT = "fanout"
 
 @dataclass(kw_only=True)
 class Configuration:
@@ -35,11 +40,25 @@ class Configuration:
     # Common configuration
     report_structure: str = DEFAULT_REPORT_STRUCTURE # Defaults to the default report structure
     search_api: SearchAPI = SearchAPI.TAVILY # Default to TAVILY
-    search_api_config: Optional[Dict[str, Any]] = None
+    search_api_config: Optional[Dict[str, Any]] = None # For "fanout": providers, quorum, deadline and provider_params
+    backup_search_api: Optional[SearchAPI] = None # Secondary search API for hedged requests when the primary is slow or failing
+    search_deadline: Optional[float] = None # Time limit in seconds for each search call (None waits indefinitely)
+    source_token_budget: Optional[int] = None # Total tokens of source content per search, split by relevance (None keeps a fixed per-source limit)
     
     # Graph-specific configuration
     number_of_queries: int = 2 # Number of search queries to generate per iteration
     max_search_depth: int = 2 # Maximum number of reflection + search iterations
+    max_concurrent_sections: int = 4 # Sections researched or written at the same time (0 for no limit)
+    llm_requests_per_second: Optional[float] = None # Shared request rate limit per LLM provider (None for no limit)
+    search_requests_per_second: Optional[float] = None # Shared request rate limit per search provider (None for no limit)
+    max_passages: int = 30 # Passages kept per section after relevance ranking (0 disables passage extraction)
+    pipelined_section_writing: bool = False # Prefetch predicted follow-up research while a section is written and graded
+    skip_grading_coverage: Optional[float] = None # Skip grading when this fraction of section key terms appears in the sources (None always grades)
+    llm_cache_enabled: bool = False # Cache planner, query-writer and grader responses
+    llm_cache_path: Optional[str] = None # SQLite file for the LLM cache (None keeps it in memory)
+    llm_cache_max_entries: int = 2048 # Least recently used responses are evicted beyond this
+    llm_cache_similarity_threshold: Optional[float] = None # Cosine similarity for a semantic hit, e.g. 0.97 (None disables the embedding tier)
+    llm_cache_embedding_model: Optional[str] = None # Embedding model for the semantic tier, e.g. "openai:text-embedding-3-small"
     planner_provider: str = "anthropic"  # Defaults to Anthropic as provider
     planner_model: str = "claude-3-7-sonnet-latest" # Defaults to claude-3-7-sonnet-latest
     planner_model_kwargs: Optional[Dict[str, Any]] = None # kwargs for planner_model
@@ -50,18 +69,142 @@ class Configuration:
     # Multi-agent specific configuration
     supervisor_model: str = "openai:gpt-4.1" # Model for supervisor agent in multi-agent setup
     researcher_model: str = "openai:gpt-4.1" # Model for research agents in multi-agent setup 
+    max_concurrent_tool_calls: int = 4 # Tool calls from one model turn that run at the same time
+
+    def __post_init__(self):
+        """Coerce string values (from env vars or JSON configs) to the declared types and validate them."""
+        for name, field_type in _field_types(type(self)).items():
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, _coerce(name, value, field_type))
+
+        for name in ("number_of_queries", "max_search_depth", "llm_cache_max_entries", "max_concurrent_tool_calls"):
+            if getattr(self, name) < 1:
+                raise ValueError(f"Configuration field '{name}' must be at least 1, got {getattr(self, name)}")
+        for name in ("llm_requests_per_second", "search_requests_per_second"):
+            if getattr(self, name) is not None and getattr(self, name) <= 0:
+                raise ValueError(f"Configuration field '{name}' must be positive, got {getattr(self, name)}")
+        for name in ("max_concurrent_sections", "max_passages", "source_token_budget"):
+            if getattr(self, name) is not None and getattr(self, name) < 0:
+                raise ValueError(f"Configuration field '{name}' must not be negative, got {getattr(self, name)}")
+        if self.search_deadline is not None and self.search_deadline <= 0:
+            raise ValueError(f"Configuration field 'search_deadline' must be positive, got {self.search_deadline}")
+        for name in ("skip_grading_coverage", "llm_cache_similarity_threshold"):
+            if getattr(self, name) is not None and not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"Configuration field '{name}' must be between 0 and 1, got {getattr(self, name)}")
 
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
     ) -> "Configuration":
-        """Create a Configuration instance from a RunnableConfig."""
+        """Create a Configuration instance from a RunnableConfig.
+        
+        Environment variables take precedence over the configurable values; they are read
+        once and snapshotted (clear_cache() takes a new snapshot). The parsed and validated
+        instance is memoised on the identity of the configurable dict and its thread_id, so
+        repeated calls with the same config are a dict lookup, and otherwise on the thread_id
+        and configuration values, so the nodes of a run share one instance; treat it and the
+        configurable dict as read-only.
+        """
         configurable = (
             config["configurable"] if config and "configurable" in config else {}
         )
-        values: dict[str, Any] = {
-            f.name: os.environ.get(f.name.upper(), configurable.get(f.name))
-            for f in fields(cls)
-            if f.init
-        }
-        return cls(**{k: v for k, v in values.items() if v})
+        thread_id = configurable.get("thread_id")
+        identity = (cls, id(configurable), thread_id)
+        with _config_cache_lock:
+            entry = _identity_cache.get(identity)
+            # The entry holds the configurable dict, so its id cannot be reused while cached
+            if entry is not None and entry[0] is configurable:
+                _identity_cache.move_to_end(identity)
+                return entry[1]
+
+        values: dict[str, Any] = {name: configurable[name] for name in _field_types(cls)
+                                  if configurable.get(name) is not None}
+        values.update(_env_values(cls))
+        key = (cls, thread_id, json.dumps(values, sort_keys=True, default=repr))
+        with _config_cache_lock:
+            instance = _config_cache.get(key)
+            if instance is not None:
+                _config_cache.move_to_end(key)
+        if instance is None:
+            instance = cls(**values)
+
+        with _config_cache_lock:
+            _config_cache[key] = instance
+            _identity_cache[identity] = (configurable, instance)
+            for cache in (_config_cache, _identity_cache):
+                while len(cache) > _CONFIG_CACHE_SIZE:
+                    cache.popitem(last=False)
+        return instance
+
+    @staticmethod
+    def clear_cache():
+        """Forget every memoised configuration and re-read the environment on next use."""
+        with _config_cache_lock:
+            _config_cache.clear()
+            _identity_cache.clear()
+            _env_values_cache.clear()
+
+_CONFIG_CACHE_SIZE = 256
+_config_cache: "OrderedDict[tuple, Configuration]" = OrderedDict()
+_identity_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_config_cache_lock = threading.Lock()
+_field_types_cache: Dict[type, Dict[str, Any]] = {}
+_env_values_cache: Dict[type, Dict[str, str]] = {}
+
+def _env_values(cls) -> Dict[str, str]:
+    """Snapshot of the configuration fields set through environment variables."""
+    if cls not in _env_values_cache:
+        values = {}
+        for name in _field_types(cls):
+            value = os.environ.get(name.upper())
+            if value not in (None, ""):
+                values[name] = value
+        _env_values_cache[cls] = values
+    return _env_values_cache[cls]
+
+def _field_types(cls) -> Dict[str, Any]:
+    """Declared type of every init field, with Optional[...] unwrapped."""
+    if cls not in _field_types_cache:
+        hints = get_type_hints(cls)
+        types = {}
+        for f in fields(cls):
+            if not f.init:
+                continue
+            field_type = hints[f.name]
+            if get_origin(field_type) is Union:
+                field_type = next(a for a in get_args(field_type) if a is not type(None))
+            types[f.name] = field_type
+        _field_types_cache[cls] = types
+    return _field_types_cache[cls]
+
+def _coerce(name: str, value: Any, field_type: Any) -> Any:
+    try:
+        if isinstance(field_type, type) and issubclass(field_type, Enum):
+            return value if isinstance(value, field_type) else field_type(value)
+        if field_type is bool:
+            if isinstance(value, str):
+                if value.strip().lower() in ("1", "true", "yes", "on"):
+                    return True
+                if value.strip().lower() in ("0", "false", "no", "off"):
+                    return False
+                raise ValueError(f"not a boolean: {value!r}")
+            return bool(value)
+        if field_type is int:
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError(f"not an integer: {value!r}")
+            return int(value)
+        if field_type is float:
+            return float(value)
+        if get_origin(field_type) is dict or field_type is dict:
+            if isinstance(value, str):
+                value = json.loads(value)
+            if not isinstance(value, dict):
+                raise ValueError(f"not a JSON object: {value!r}")
+            return value
+    except (ValueError, TypeError) as e:
+        if isinstance(field_type, type) and issubclass(field_type, Enum):
+            choices = ", ".join(m.value for m in field_type)
+            raise ValueError(f"Invalid value for configuration field '{name}': {value!r} (expected one of: {choices})") from e
+        raise ValueError(f"Invalid value for configuration field '{name}': {e}") from e
+    return value
@@ -1,6 +1,9 @@
-from typing import Literal
+import asyncio
+import contextlib
+import re
+import weakref
+from typing import List, Literal, Optional
 
-from langchain.chat_models import init_chat_model
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.runnables import RunnableConfig
 
@@ -23,6 +26,7 @@ from open_deep_research.prompts import (
     report_planner_query_writer_instructions,
     report_planner_instructions,
     query_writer_instructions, 
+    follow_up_query_predictor_instructions,
     section_writer_instructions,
     final_section_writer_instructions,
     section_grader_instructions,
@@ -34,8 +38,33 @@ from open_deep_research.utils import (
     format_sections, 
     get_config_value, 
     get_search_params, 
-    select_and_execute_search
+    get_chat_model,
+    get_structured_model,
+    select_and_execute_search,
+    extract_relevant_passages,
+    source_coverage
 )
+from open_deep_research.llm_cache import ainvoke_cached, get_llm_cache
+from open_deep_research.report_assembler import SECTION_SEPARATOR
+
+# Semaphores bounding how many sections are worked on at once, per event loop and limit.
+# A semaphore that was waited on references its loop, so the weak key alone cannot drop the
+# entry; the entries of closed loops are pruned instead.
+_section_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[int, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+def section_slot(limit: Optional[int]):
+    """Async context manager that holds one of `limit` section slots (no limit when 0 or None)."""
+    if not limit:
+        return contextlib.nullcontext()
+    loop = asyncio.get_running_loop()
+    if loop not in _section_semaphores:
+        for closed in [other for other in _section_semaphores if other.is_closed()]:
+            del _section_semaphores[closed]
+        _section_semaphores[loop] = {}
+    semaphores = _section_semaphores[loop]
+    if limit not in semaphores:
+        semaphores[limit] = asyncio.Semaphore(limit)
+    return semaphores[limit]
 
 ## Nodes -- 
 
@@ -81,21 +110,30 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
     writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider, model_kwargs=writer_model_kwargs) 
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = get_structured_model(Queries, model=writer_model_name, model_provider=writer_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=writer_model_kwargs)
 
     # Format system instructions
     system_instructions_query = report_planner_query_writer_instructions.format(topic=topic, report_organization=report_structure, number_of_queries=number_of_queries)
 
     # Generate queries  
-    results = await structured_llm.ainvoke([SystemMessage(content=system_instructions_query),
-                                     HumanMessage(content="Generate search queries that will help with planning the sections of the report.")])
+    llm_cache = get_llm_cache(configurable)
+    results = await ainvoke_cached(structured_llm,
+                                   [SystemMessage(content=system_instructions_query),
+                                    HumanMessage(content="Generate search queries that will help with planning the sections of the report.")],
+                                   Queries,
+                                   {"provider": writer_provider, "model": writer_model_name, "kwargs": writer_model_kwargs},
+                                   llm_cache,
+                                   semantic_key=topic,
+                                   semantic_scope=[report_structure, number_of_queries])
 
     # Web search
     query_list = [query.search_query for query in results.queries]
 
     # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
+    source_str = await select_and_execute_search(search_api, query_list, params_to_pass, configurable.source_token_budget,
+                                                 backup_search_api=get_config_value(configurable.backup_search_api),
+                                                 deadline=configurable.search_deadline,
+                                                 requests_per_second=configurable.search_requests_per_second)
 
     # Format system instructions
     system_instructions_sections = report_planner_instructions.format(topic=topic, report_organization=report_structure, context=source_str, feedback=feedback)
@@ -112,21 +150,28 @@ async def generate_report_plan(state: ReportState, config: RunnableConfig):
     # Run the planner
     if planner_model == "claude-3-7-sonnet-latest":
         # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
-        planner_llm = init_chat_model(model=planner_model, 
-                                      model_provider=planner_provider, 
-                                      max_tokens=20_000, 
-                                      thinking={"type": "enabled", "budget_tokens": 16_000})
+        structured_llm = get_structured_model(Sections,
+                                              model=planner_model, 
+                                              model_provider=planner_provider, requests_per_second=configurable.llm_requests_per_second, 
+                                              max_tokens=20_000, 
+                                              thinking={"type": "enabled", "budget_tokens": 16_000})
 
     else:
         # With other models, thinking tokens are not specifically allocated
-        planner_llm = init_chat_model(model=planner_model, 
-                                      model_provider=planner_provider,
-                                      model_kwargs=planner_model_kwargs)
+        structured_llm = get_structured_model(Sections,
+                                              model=planner_model, 
+                                              model_provider=planner_provider, requests_per_second=configurable.llm_requests_per_second,
+                                              model_kwargs=planner_model_kwargs)
     
     # Generate the report sections
-    structured_llm = planner_llm.with_structured_output(Sections)
-    report_sections = await structured_llm.ainvoke([SystemMessage(content=system_instructions_sections),
-                                             HumanMessage(content=planner_message)])
+    report_sections = await ainvoke_cached(structured_llm,
+                                           [SystemMessage(content=system_instructions_sections),
+                                            HumanMessage(content=planner_message)],
+                                           Sections,
+                                           {"provider": planner_provider, "model": planner_model, "kwargs": planner_model_kwargs},
+                                           llm_cache,
+                                           semantic_key=topic,
+                                           semantic_scope=[report_structure, feedback])
 
     # Get sections
     sections = report_sections.sections
@@ -211,8 +256,7 @@ async def generate_queries(state: SectionState, config: RunnableConfig):
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
     writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider, model_kwargs=writer_model_kwargs) 
-    structured_llm = writer_model.with_structured_output(Queries)
+    structured_llm = get_structured_model(Queries, model=writer_model_name, model_provider=writer_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=writer_model_kwargs)
 
     # Format system instructions
     system_instructions = query_writer_instructions.format(topic=topic, 
@@ -220,8 +264,14 @@ async def generate_queries(state: SectionState, config: RunnableConfig):
                                                            number_of_queries=number_of_queries)
 
     # Generate queries  
-    queries = await structured_llm.ainvoke([SystemMessage(content=system_instructions),
-                                     HumanMessage(content="Generate search queries on the provided topic.")])
+    queries = await ainvoke_cached(structured_llm,
+                                   [SystemMessage(content=system_instructions),
+                                    HumanMessage(content="Generate search queries on the provided topic.")],
+                                   Queries,
+                                   {"provider": writer_provider, "model": writer_model_name, "kwargs": writer_model_kwargs},
+                                   get_llm_cache(configurable),
+                                   semantic_key=f"{topic}\n{section.description}",
+                                   semantic_scope=number_of_queries)
 
     return {"search_queries": queries.queries}
 
@@ -254,11 +304,120 @@ async def search_web(state: SectionState, config: RunnableConfig):
     query_list = [query.search_query for query in search_queries]
 
     # Search the web with parameters
-    source_str = await select_and_execute_search(search_api, query_list, params_to_pass)
+    source_str = await select_and_execute_search(search_api, query_list, params_to_pass, configurable.source_token_budget,
+                                                 backup_search_api=get_config_value(configurable.backup_search_api),
+                                                 deadline=configurable.search_deadline,
+                                                 requests_per_second=configurable.search_requests_per_second)
 
     return {"source_str": source_str, "search_iterations": state["search_iterations"] + 1}
 
-async def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END, "search_web"]]:
+def extract_passages(state: SectionState, config: RunnableConfig):
+    """Keep only the passages of the search results that are relevant to the section.
+    
+    This node:
+    1. Splits every source page into passages
+    2. Ranks the passages with BM25 against the section description and search queries
+    3. Keeps the top passages under their source headers
+    
+    Args:
+        state: Current state with search results and section info
+        config: Configuration including the number of passages to keep
+        
+    Returns:
+        Dict with the condensed source string
+    """
+
+    # Get configuration
+    configurable = Configuration.from_runnable_config(config)
+    if not configurable.max_passages:
+        return {}
+
+    # Rank passages against everything we know the section is about
+    section = state["section"]
+    queries = [section.name, section.description] + [query.search_query for query in state["search_queries"]]
+    source_str = extract_relevant_passages(state["source_str"], queries, max_passages=configurable.max_passages)
+
+    return {"source_str": source_str}
+
+async def _prefetch_follow_up_research(state: SectionState, configurable: Configuration):
+    """Predict follow-up queries for a section and run the searches for them.
+    
+    Returns:
+        Tuple of the predicted queries and the formatted source string
+    """
+
+    section = state["section"]
+
+    # Predict the queries the grader is likely to ask for
+    writer_provider = get_config_value(configurable.writer_provider)
+    writer_model_name = get_config_value(configurable.writer_model)
+    writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
+    structured_llm = get_structured_model(Queries, model=writer_model_name, model_provider=writer_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=writer_model_kwargs)
+
+    previous_queries = "\n".join(f"- {query.search_query}" for query in state["search_queries"])
+    system_instructions = follow_up_query_predictor_instructions.format(topic=state["topic"], 
+                                                                        section_topic=section.description, 
+                                                                        previous_queries=previous_queries,
+                                                                        number_of_queries=configurable.number_of_queries)
+    queries = await ainvoke_cached(structured_llm,
+                                   [SystemMessage(content=system_instructions),
+                                    HumanMessage(content="Generate follow-up search queries for the section.")],
+                                   Queries,
+                                   {"provider": writer_provider, "model": writer_model_name, "kwargs": writer_model_kwargs},
+                                   get_llm_cache(configurable),
+                                   semantic_key=f"{state['topic']}\n{section.description}",
+                                   semantic_scope=configurable.number_of_queries)
+
+    # Search for them
+    source_str = await _search_follow_up_queries([query.search_query for query in queries.queries], configurable)
+
+    return queries.queries, source_str
+
+async def _search_follow_up_queries(query_list: List[str], configurable: Configuration) -> str:
+    """Search for follow-up queries with the configured search API."""
+    search_api = get_config_value(configurable.search_api)
+    params_to_pass = get_search_params(search_api, configurable.search_api_config or {})
+    return await select_and_execute_search(search_api, query_list, params_to_pass, configurable.source_token_budget,
+                                           backup_search_api=get_config_value(configurable.backup_search_api),
+                                           deadline=configurable.search_deadline,
+                                           requests_per_second=configurable.search_requests_per_second)
+
+def _query_terms(query: str) -> frozenset:
+    return frozenset(re.findall(r"\w+", query.lower()))
+
+async def _merge_prefetched_research(prefetch: asyncio.Task, feedback: Feedback, configurable: Configuration):
+    """Combine the prefetched research with the grader's follow-up queries.
+    
+    The prediction was made before the section was written, so the grader's queries stay
+    authoritative: the ones the prefetch did not already search are searched now and their
+    results are added to the prefetched ones.
+    
+    Returns:
+        Tuple of the merged queries and source string, or None if the prefetch failed
+    """
+
+    try:
+        predicted_queries, prefetched_source_str = await prefetch
+    except Exception as e:
+        print(f"Prefetching follow-up research failed, searching the grader's queries instead: {e}")
+        return None
+
+    searched = {_query_terms(query.search_query) for query in predicted_queries}
+    missing = []
+    for query in feedback.follow_up_queries:
+        terms = _query_terms(query.search_query or "")
+        if terms and terms not in searched:
+            searched.add(terms)
+            missing.append(query)
+
+    source_str = prefetched_source_str
+    if missing:
+        missing_source_str = await _search_follow_up_queries([query.search_query for query in missing], configurable)
+        source_str = f"{prefetched_source_str}\n\n{missing_source_str}" if prefetched_source_str else missing_source_str
+
+    return list(predicted_queries) + missing, source_str
+
+async def write_section(state: SectionState, config: RunnableConfig) -> Command[Literal[END, "search_web", "extract_passages"]]:
     """Write a section of the report and evaluate if more research is needed.
     
     This node:
@@ -268,6 +427,10 @@ async def write_section(state: SectionState, config: RunnableConfig) -> Command[
        - Completes the section if quality passes
        - Triggers more research if quality fails
     
+    With pipelined_section_writing enabled, follow-up queries are predicted and searched
+    while the section is written and graded, so a failing grade goes straight back to
+    passage extraction with the prefetched results instead of waiting on a new search.
+    
     Args:
         state: Current state with search results and section info
         config: Configuration for writing and evaluation
@@ -284,6 +447,11 @@ async def write_section(state: SectionState, config: RunnableConfig) -> Command[
     # Get configuration
     configurable = Configuration.from_runnable_config(config)
 
+    # Speculatively start the next round of research; it is only needed if the section fails grading
+    prefetch = None
+    if configurable.pipelined_section_writing and state["search_iterations"] < configurable.max_search_depth:
+        prefetch = asyncio.create_task(_prefetch_follow_up_research(state, configurable))
+
     # Format system instructions
     section_writer_inputs_formatted = section_writer_inputs.format(topic=topic, 
                                                              section_name=section.name, 
@@ -291,60 +459,95 @@ async def write_section(state: SectionState, config: RunnableConfig) -> Command[
                                                              context=source_str, 
                                                              section_content=section.content)
 
-    # Generate section  
-    writer_provider = get_config_value(configurable.writer_provider)
-    writer_model_name = get_config_value(configurable.writer_model)
-    writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider, model_kwargs=writer_model_kwargs) 
+    try:
+        # Generate section  
+        writer_provider = get_config_value(configurable.writer_provider)
+        writer_model_name = get_config_value(configurable.writer_model)
+        writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
+        writer_model = get_chat_model(model=writer_model_name, model_provider=writer_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=writer_model_kwargs) 
 
-    section_content = await writer_model.ainvoke([SystemMessage(content=section_writer_instructions),
-                                           HumanMessage(content=section_writer_inputs_formatted)])
+        section_content = await writer_model.ainvoke([SystemMessage(content=section_writer_instructions),
+                                               HumanMessage(content=section_writer_inputs_formatted)])
     
-    # Write content to the section object  
-    section.content = section_content.content
-
-    # Grade prompt 
-    section_grader_message = ("Grade the report and consider follow-up questions for missing information. "
-                              "If the grade is 'pass', return empty strings for all follow-up queries. "
-                              "If the grade is 'fail', provide specific search queries to gather missing information.")
+        # Write content to the section object  
+        section.content = section_content.content
+
+        # Skip grading when the sources already cover the section topic well
+        if configurable.skip_grading_coverage is not None and \
+                source_coverage(source_str, f"{section.name} {section.description}") >= configurable.skip_grading_coverage:
+            return Command(
+                update={"completed_sections": [section]},
+                goto=END
+            )
+
+        # Grade prompt 
+        section_grader_message = ("Grade the report and consider follow-up questions for missing information. "
+                                  "If the grade is 'pass', return empty strings for all follow-up queries. "
+                                  "If the grade is 'fail', provide specific search queries to gather missing information.")
     
-    section_grader_instructions_formatted = section_grader_instructions.format(topic=topic, 
-                                                                               section_topic=section.description,
-                                                                               section=section.content, 
-                                                                               number_of_follow_up_queries=configurable.number_of_queries)
-
-    # Use planner model for reflection
-    planner_provider = get_config_value(configurable.planner_provider)
-    planner_model = get_config_value(configurable.planner_model)
-    planner_model_kwargs = get_config_value(configurable.planner_model_kwargs or {})
-
-    if planner_model == "claude-3-7-sonnet-latest":
-        # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider, 
-                                           max_tokens=20_000, 
-                                           thinking={"type": "enabled", "budget_tokens": 16_000}).with_structured_output(Feedback)
-    else:
-        reflection_model = init_chat_model(model=planner_model, 
-                                           model_provider=planner_provider, model_kwargs=planner_model_kwargs).with_structured_output(Feedback)
-    # Generate feedback
-    feedback = await reflection_model.ainvoke([SystemMessage(content=section_grader_instructions_formatted),
-                                        HumanMessage(content=section_grader_message)])
-
-    # If the section is passing or the max search depth is reached, publish the section to completed sections 
-    if feedback.grade == "pass" or state["search_iterations"] >= configurable.max_search_depth:
-        # Publish the section to completed sections 
-        return  Command(
-        update={"completed_sections": [section]},
-        goto=END
-    )
+        section_grader_instructions_formatted = section_grader_instructions.format(topic=topic, 
+                                                                                   section_topic=section.description,
+                                                                                   section=section.content, 
+                                                                                   number_of_follow_up_queries=configurable.number_of_queries)
+
+        # Use planner model for reflection
+        planner_provider = get_config_value(configurable.planner_provider)
+        planner_model = get_config_value(configurable.planner_model)
+        planner_model_kwargs = get_config_value(configurable.planner_model_kwargs or {})
+
+        if planner_model == "claude-3-7-sonnet-latest":
+            # Allocate a thinking budget for claude-3-7-sonnet-latest as the planner model
+            reflection_model = get_structured_model(Feedback,
+                                                    model=planner_model, 
+                                                    model_provider=planner_provider, requests_per_second=configurable.llm_requests_per_second, 
+                                                    max_tokens=20_000, 
+                                                    thinking={"type": "enabled", "budget_tokens": 16_000})
+        else:
+            reflection_model = get_structured_model(Feedback,
+                                                    model=planner_model, 
+                                                    model_provider=planner_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=planner_model_kwargs)
+        # Generate feedback
+        feedback = await ainvoke_cached(reflection_model,
+                                        [SystemMessage(content=section_grader_instructions_formatted),
+                                         HumanMessage(content=section_grader_message)],
+                                        Feedback,
+                                        {"provider": planner_provider, "model": planner_model, "kwargs": planner_model_kwargs},
+                                        get_llm_cache(configurable))
+
+        # If the section is passing or the max search depth is reached, publish the section to completed sections 
+        if feedback.grade == "pass" or state["search_iterations"] >= configurable.max_search_depth:
+            # Publish the section to completed sections 
+            return  Command(
+            update={"completed_sections": [section]},
+            goto=END
+        )
 
-    # Update the existing section with new content and update search queries
-    else:
+        # Use the prefetched research plus any grader queries it missed, otherwise search for the grader's queries
+        if prefetch is not None:
+            merged = await _merge_prefetched_research(prefetch, feedback, configurable)
+            if merged is not None:
+                search_queries, merged_source_str = merged
+                return  Command(
+                update={"search_queries": search_queries, 
+                        "source_str": merged_source_str, 
+                        "search_iterations": state["search_iterations"] + 1, 
+                        "section": section},
+                goto="extract_passages"
+                )
+
+        # Update the existing section with new content and update search queries
         return  Command(
         update={"search_queries": feedback.follow_up_queries, "section": section},
         goto="search_web"
         )
+    finally:
+        # Don't leave speculative research running once the section no longer needs it
+        if prefetch is not None:
+            if not prefetch.done():
+                prefetch.cancel()
+            elif not prefetch.cancelled():
+                # Retrieve the exception of a prefetch nobody awaited, so asyncio doesn't log it as lost
+                prefetch.exception()
     
 async def write_final_sections(state: SectionState, config: RunnableConfig):
     """Write sections that don't require research using completed sections as context.
@@ -375,10 +578,11 @@ async def write_final_sections(state: SectionState, config: RunnableConfig):
     writer_provider = get_config_value(configurable.writer_provider)
     writer_model_name = get_config_value(configurable.writer_model)
     writer_model_kwargs = get_config_value(configurable.writer_model_kwargs or {})
-    writer_model = init_chat_model(model=writer_model_name, model_provider=writer_provider, model_kwargs=writer_model_kwargs) 
+    writer_model = get_chat_model(model=writer_model_name, model_provider=writer_provider, requests_per_second=configurable.llm_requests_per_second, model_kwargs=writer_model_kwargs) 
     
-    section_content = await writer_model.ainvoke([SystemMessage(content=system_instructions),
-                                           HumanMessage(content="Generate a report section based on the provided sources.")])
+    async with section_slot(configurable.max_concurrent_sections):
+        section_content = await writer_model.ainvoke([SystemMessage(content=system_instructions),
+                                               HumanMessage(content="Generate a report section based on the provided sources.")])
     
     # Write content to section 
     section.content = section_content.content
@@ -431,7 +635,7 @@ def compile_final_report(state: ReportState):
         section.content = completed_sections[section.name]
 
     # Compile final report
-    all_sections = "\n\n".join([s.content for s in sections])
+    all_sections = SECTION_SEPARATOR.join([s.content for s in sections])
 
     return {"final_report": all_sections}
 
@@ -461,12 +665,26 @@ def initiate_final_section_writing(state: ReportState):
 section_builder = StateGraph(SectionState, output=SectionOutputState)
 section_builder.add_node("generate_queries", generate_queries)
 section_builder.add_node("search_web", search_web)
+section_builder.add_node("extract_passages", extract_passages)
 section_builder.add_node("write_section", write_section)
 
 # Add edges
 section_builder.add_edge(START, "generate_queries")
 section_builder.add_edge("generate_queries", "search_web")
-section_builder.add_edge("search_web", "write_section")
+section_builder.add_edge("search_web", "extract_passages")
+section_builder.add_edge("extract_passages", "write_section")
+
+section_graph = section_builder.compile()
+
+async def build_section_with_web_research(state: SectionState, config: RunnableConfig):
+    """Research and write one section, with at most max_concurrent_sections in flight.
+    
+    human_feedback fans out one Send() per research section; the excess sections wait
+    here for a free slot instead of all hitting the LLM and search providers at once.
+    """
+    configurable = Configuration.from_runnable_config(config)
+    async with section_slot(configurable.max_concurrent_sections):
+        return await section_graph.ainvoke(state, config)
 
 # Outer graph for initial report plan compiling results from each section -- 
 
@@ -474,7 +692,7 @@ section_builder.add_edge("search_web", "write_section")
 builder = StateGraph(ReportState, input=ReportStateInput, output=ReportStateOutput, config_schema=Configuration)
 builder.add_node("generate_report_plan", generate_report_plan)
 builder.add_node("human_feedback", human_feedback)
-builder.add_node("build_section_with_web_research", section_builder.compile())
+builder.add_node("build_section_with_web_research", build_section_with_web_research)
 builder.add_node("gather_completed_sections", gather_completed_sections)
 builder.add_node("write_final_sections", write_final_sections)
 builder.add_node("compile_final_report", compile_final_report)
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(messages: List[Any]) -> str:
+    """Render a list of chat messages as one string with whitespace runs collapsed."""
+    parts = []
+    for message in messages:
+        role = getattr(message, "type", None) or message.get("role", "")
+        content = getattr(message, "content", None)
+        if content is None:
+            content = message.get("content", "")
+        content = re.sub(r"\s+", " ", str(content)).strip()
+        parts.append(f"{role}: {content}")
+    return "\n".join(parts)
+
+
+class LLMResponseCache:
+    """
+    Cache of structured LLM responses for recurring prompts.
+
+    Lookups go through two tiers:
+    1. Exact match on a hash of the normalised prompt, the output schema and the model config
+    2. Optional semantic match: the embedding of the prompt's variable part (its semantic
+       key, e.g. the topic) is compared (cosine similarity) against stored keys for the same
+       schema, model config and semantic scope, and the closest one is reused if it clears
+       similarity_threshold. Prompts without a semantic key only use the exact tier; the
+       shared instructions are left out of the embedding so they cannot dominate it.
+
+    Entries are persisted in SQLite (in memory when no path is given) and the least recently
+    used ones are evicted once max_entries is exceeded.
+
+    Args:
+        path: SQLite database file, or None to keep the cache in memory
+        max_entries: Maximum number of cached responses
+        embeddings: Optional LangChain Embeddings used for the semantic tier
+        similarity_threshold: Minimum cosine similarity for a semantic hit
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 2048,
+                 embeddings=None, similarity_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_namespace ON llm_cache (namespace)")
+        self._db.commit()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _namespace(schema: Type[BaseModel], model_config: Dict[str, Any], semantic_scope: Any = None) -> str:
+        return hashlib.sha256(json.dumps(
+            [f"{schema.__module__}.{schema.__qualname__}", model_config, semantic_scope], sort_keys=True, default=repr
+        ).encode()).hexdigest()
+
+    async def _embed(self, semantic_key: Optional[str]) -> Optional[np.ndarray]:
+        if self.embeddings is None or self.similarity_threshold is None or not semantic_key:
+            return None
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(semantic_key), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Embedding for the LLM cache failed, using exact matches only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def aget(self, messages: List[Any], schema: Type[BaseModel], model_config: Dict[str, Any],
+                   semantic_key: Optional[str] = None, semantic_scope: Any = None):
+        """
+        Return a cached response for the prompt, or None on a miss.
+
+        semantic_key is the variable part of the prompt used for the semantic tier, and
+        semantic_scope holds the values that must match exactly for a semantic hit.
+        """
+        namespace = self._namespace(schema, model_config, semantic_scope)
+        prompt = normalize_prompt(messages)
+        key = hashlib.sha256(f"{namespace}\n{prompt}".encode()).hexdigest()
+
+        with self._lock:
+            row = self._db.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._touch(key)
+            self.hits += 1
+            return schema.model_validate_json(row[0])
+
+        vector = await self._embed(semantic_key)
+        if vector is not None:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT key, response, embedding FROM llm_cache WHERE namespace = ? AND embedding IS NOT NULL",
+                    (namespace,),
+                ).fetchall()
+            if rows:
+                matrix = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    self._touch(rows[best][0])
+                    self.semantic_hits += 1
+                    return schema.model_validate_json(rows[best][1])
+
+        self.misses += 1
+        return None
+
+    async def aput(self, messages: List[Any], schema: Type[BaseModel], model_config: Dict[str, Any], response: BaseModel,
+                   semantic_key: Optional[str] = None, semantic_scope: Any = None):
+        """Store a response for the prompt, evicting the least recently used entries if needed."""
+        namespace = self._namespace(schema, model_config, semantic_scope)
+        prompt = normalize_prompt(messages)
+        key = hashlib.sha256(f"{namespace}\n{prompt}".encode()).hexdigest()
+        vector = await self._embed(semantic_key)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, response, embedding, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, response.model_dump_json(), vector.tobytes() if vector is not None else None, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def _touch(self, key: str):
+        with self._lock:
+            self._db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, so similarity thresholds can be tuned against real traffic."""
+        lookups = self.hits + self.semantic_hits + self.misses
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+
+_llm_caches: Dict[str, LLMResponseCache] = {}
+_llm_caches_lock = threading.Lock()
+
+
+def get_llm_cache(configurable) -> Optional[LLMResponseCache]:
+    """Return the process-wide LLM response cache described by the configuration, if enabled."""
+    if not configurable.llm_cache_enabled:
+        return None
+    key = json.dumps([configurable.llm_cache_path, configurable.llm_cache_embedding_model,
+                      configurable.llm_cache_max_entries, configurable.llm_cache_similarity_threshold])
+    with _llm_caches_lock:
+        cache = _llm_caches.get(key)
+        if cache is None:
+            embeddings = None
+            if configurable.llm_cache_embedding_model:
+                from langchain.embeddings import init_embeddings
+                embeddings = init_embeddings(configurable.llm_cache_embedding_model)
+            cache = _llm_caches[key] = LLMResponseCache(
+                path=configurable.llm_cache_path,
+                max_entries=configurable.llm_cache_max_entries,
+                embeddings=embeddings,
+                similarity_threshold=configurable.llm_cache_similarity_threshold,
+            )
+    return cache
+
+
+async def ainvoke_cached(structured_llm, messages: List[Any], schema: Type[BaseModel],
+                         model_config: Dict[str, Any], cache: Optional[LLMResponseCache],
+                         semantic_key: Optional[str] = None, semantic_scope: Any = None):
+    """
+    Invoke a structured-output model, serving and storing the response through the cache.
+
+    The cache is best effort: if it fails, the model is called as if there were no cache.
+    semantic_key and semantic_scope are passed on to LLMResponseCache.aget.
+    """
+    if cache is None:
+        return await structured_llm.ainvoke(messages)
+    try:
+        response = await cache.aget(messages, schema, model_config, semantic_key, semantic_scope)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed, calling the model: {e}")
+        response = None
+    if response is not None:
+        return response
+
+    response = await structured_llm.ainvoke(messages)
+    try:
+        await cache.aput(messages, schema, model_config, response, semantic_key, semantic_scope)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"LLM cache stats: {cache.stats()}")
+    except Exception as e:
+        logger.warning(f"Storing the response in the LLM cache failed: {e}")
+    return response
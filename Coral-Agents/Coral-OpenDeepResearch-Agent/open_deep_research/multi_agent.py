@@ -1,7 +1,7 @@
+import asyncio
 from typing import List, Annotated, TypedDict, operator, Literal
 from pydantic import BaseModel, Field
 
-from langchain.chat_models import init_chat_model
 from langchain_core.tools import tool
 from langchain_core.runnables import RunnableConfig
 from langgraph.graph import MessagesState
@@ -10,7 +10,14 @@ from langgraph.types import Command, Send
 from langgraph.graph import START, END, StateGraph
 
 from open_deep_research.configuration import Configuration
-from open_deep_research.utils import get_config_value, tavily_search, duckduckgo_search
+from open_deep_research.utils import (
+    get_config_value,
+    get_chat_model,
+    get_search_params,
+    make_search_tool,
+    tavily_search,
+    duckduckgo_search
+)
 from open_deep_research.prompts import SUPERVISOR_INSTRUCTIONS, RESEARCH_INSTRUCTIONS
 
 ## Tools factory - will be initialized based on configuration
@@ -19,17 +26,14 @@ def get_search_tool(config: RunnableConfig):
     configurable = Configuration.from_runnable_config(config)
     search_api = get_config_value(configurable.search_api)
 
-    # TODO: Configure other search functions as tools
     if search_api.lower() == "tavily":
         return tavily_search
     elif search_api.lower() == "duckduckgo":
         return duckduckgo_search
     else:
-        raise NotImplementedError(
-            f"The search API '{search_api}' is not yet supported in the multi-agent implementation. "
-            f"Currently, only Tavily/DuckDuckGo is supported. Please use the graph-based implementation in "
-            f"src/open_deep_research/graph.py for other search APIs, or set search_api to 'tavily' or 'duckduckgo'."
-        )
+        # Every other backend (and "fanout" across several of them) goes through the generic adapter
+        params_to_pass = get_search_params(search_api.lower(), configurable.search_api_config or {})
+        return make_search_tool(search_api.lower(), params_to_pass, configurable.source_token_budget)
 
 @tool
 class Section(BaseModel):
@@ -87,6 +91,23 @@ class SectionState(MessagesState):
 class SectionOutputState(TypedDict):
     completed_sections: list[Section] # Final key we duplicate in outer state for Send() API
 
+async def execute_tool_calls(tool_calls: list[dict], tools_by_name: dict, max_concurrency: int) -> list:
+    """Run a turn's tool calls concurrently, returning observations in the original call order.
+    
+    At most max_concurrency calls run at once. Async tools are awaited on the event loop,
+    sync tools are run in a worker thread so they don't block it.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(tool_call):
+        tool = tools_by_name[tool_call["name"]]
+        async with semaphore:
+            if getattr(tool, "coroutine", None) is not None:
+                return await tool.ainvoke(tool_call["args"])
+            return await asyncio.to_thread(tool.invoke, tool_call["args"])
+
+    return await asyncio.gather(*(run(tool_call) for tool_call in tool_calls))
+
 # Tool lists will be built dynamically based on configuration
 def get_supervisor_tools(config: RunnableConfig):
     """Get supervisor tools based on configuration"""
@@ -111,7 +132,7 @@ async def supervisor(state: ReportState, config: RunnableConfig):
     supervisor_model = get_config_value(configurable.supervisor_model)
     
     # Initialize the model
-    llm = init_chat_model(model=supervisor_model)
+    llm = get_chat_model(model=supervisor_model, requests_per_second=configurable.llm_requests_per_second)
     
     # If sections have been completed, but we don't yet have the final report, then we need to initiate writing the introduction and conclusion
     if state.get("completed_sections") and not state.get("final_report"):
@@ -144,18 +165,13 @@ async def supervisor_tools(state: ReportState, config: RunnableConfig)  -> Comma
     conclusion_content = None
 
     # Get tools based on configuration
+    configurable = Configuration.from_runnable_config(config)
     _, supervisor_tools_by_name = get_supervisor_tools(config)
     
     # First process all tool calls to ensure we respond to each one (required for OpenAI)
-    for tool_call in state["messages"][-1].tool_calls:
-        # Get the tool
-        tool = supervisor_tools_by_name[tool_call["name"]]
-        # Perform the tool call - use ainvoke for async tools
-        if hasattr(tool, 'ainvoke'):
-            observation = await tool.ainvoke(tool_call["args"])
-        else:
-            observation = tool.invoke(tool_call["args"])
-
+    tool_calls = state["messages"][-1].tool_calls
+    observations = await execute_tool_calls(tool_calls, supervisor_tools_by_name, configurable.max_concurrent_tool_calls)
+    for tool_call, observation in zip(tool_calls, observations):
         # Append to messages 
         result.append({"role": "tool", 
                        "content": observation, 
@@ -224,7 +240,7 @@ async def research_agent(state: SectionState, config: RunnableConfig):
     researcher_model = get_config_value(configurable.researcher_model)
     
     # Initialize the model
-    llm = init_chat_model(model=researcher_model)
+    llm = get_chat_model(model=researcher_model, requests_per_second=configurable.llm_requests_per_second)
 
     # Get tools based on configuration
     research_tool_list, _ = get_research_tools(config)
@@ -250,17 +266,13 @@ async def research_agent_tools(state: SectionState, config: RunnableConfig):
     completed_section = None
     
     # Get tools based on configuration
+    configurable = Configuration.from_runnable_config(config)
     _, research_tools_by_name = get_research_tools(config)
     
-    # Process all tool calls first (required for OpenAI)
-    for tool_call in state["messages"][-1].tool_calls:
-        # Get the tool
-        tool = research_tools_by_name[tool_call["name"]]
-        # Perform the tool call - use ainvoke for async tools
-        if hasattr(tool, 'ainvoke'):
-            observation = await tool.ainvoke(tool_call["args"])
-        else:
-            observation = tool.invoke(tool_call["args"])
+    # Process all tool calls first (required for OpenAI); independent searches run concurrently
+    tool_calls = state["messages"][-1].tool_calls
+    observations = await execute_tool_calls(tool_calls, research_tools_by_name, configurable.max_concurrent_tool_calls)
+    for tool_call, observation in zip(tool_calls, observations):
         # Append to messages 
         result.append({"role": "tool", 
                        "content": observation, 
@@ -0,0 +1,196 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    """Compress a page body with zstd when available, falling back to gzip."""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+@dataclass
+class CachedPage:
+    """A cached HTTP response body plus any text extracted from it."""
+    url: str
+    body: bytes  # Compressed raw response body
+    codec: str
+    content_type: str = ""
+    encoding: str = "utf-8"
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = field(default_factory=time.time)
+    extracted: Dict[str, str] = field(default_factory=dict)  # e.g. {"markdown": ..., "text": ...}
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.extracted.values())
+
+    def raw(self) -> bytes:
+        return _decompress(self.body, self.codec)
+
+    def text(self) -> str:
+        try:
+            return self.raw().decode(self.encoding, errors="replace")
+        except LookupError:  # Unknown charset advertised by the server
+            return self.raw().decode("utf-8", errors="replace")
+
+
+class PageCache:
+    """
+    Process-wide, size-bounded LRU cache of fetched web pages keyed by URL.
+
+    Fresh entries (younger than max_age seconds) are served without touching the network.
+    Stale entries are revalidated with a conditional GET using the stored ETag / Last-Modified
+    validators; a 304 response refreshes the entry instead of downloading the page again.
+    Entries without validators are downloaded again once stale.
+
+    Args:
+        max_bytes: Upper bound on the total (compressed) size of all cached entries
+        max_age: Seconds an entry is considered fresh before it needs revalidation
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_age: float = 3600.0):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached entry for url (fresh or stale) and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry: CachedPage) -> bool:
+        return time.time() - entry.fetched_at < self.max_age
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """Return the entry only if it can be served without revalidation."""
+        entry = self.get(url)
+        if entry is not None and self.is_fresh(entry):
+            self.hits += 1
+            return entry
+        return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from the validators the server sent, if any."""
+        entry = self.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def revalidated(self, url: str) -> Optional[CachedPage]:
+        """
+        Record a 304 Not Modified response and return the refreshed entry.
+
+        Returns None if the entry was evicted since its conditional headers were built; the
+        page then has to be fetched again without them.
+        """
+        entry = self.get(url)
+        if entry is not None:
+            entry.fetched_at = time.time()
+            self.revalidations += 1
+        return entry
+
+    def store(self, url: str, body: bytes, headers: Optional[Dict[str, str]] = None, **extracted: str) -> CachedPage:
+        """
+        Store a freshly downloaded (200) response body.
+
+        Args:
+            url: The requested URL
+            body: Raw, uncompressed response bytes
+            headers: Response headers used to pick up ETag / Last-Modified / Content-Type
+            **extracted: Text already extracted from the page, keyed by kind (e.g. markdown=...)
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        content_type = headers.get("content-type", "")
+        _, _, charset = content_type.lower().partition("charset=")
+        compressed, codec = _compress(body)
+        entry = CachedPage(
+            url=url,
+            body=compressed,
+            codec=codec,
+            content_type=content_type,
+            encoding=charset.split(";")[0].strip().strip('"') or "utf-8",
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            extracted=dict(extracted),
+        )
+        self.misses += 1
+        with self._lock:
+            old = self._entries.pop(url, None)
+            if old is not None:
+                self._size -= old.size
+            self._entries[url] = entry
+            self._size += entry.size
+            self._evict()
+        return entry
+
+    def extract(self, entry: CachedPage, kind: str, extractor: Callable[[CachedPage], str]) -> str:
+        """Return extracted text of the given kind, computing and caching it on first use."""
+        if kind not in entry.extracted:
+            value = extractor(entry)
+            with self._lock:
+                entry.extracted[kind] = value
+                if self._entries.get(entry.url) is entry:
+                    self._size += len(value)
+                    self._evict()
+        return entry.extracted[kind]
+
+    def _evict(self):
+        # Caller holds the lock. Never evict the entry that was just inserted.
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+        }
+
+
+_page_cache: Optional[PageCache] = None
+
+
+def get_page_cache() -> PageCache:
+    """Return the page cache shared by every search backend in this process."""
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = PageCache()
+    return _page_cache
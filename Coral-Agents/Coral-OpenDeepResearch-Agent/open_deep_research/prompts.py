@@ -104,6 +104,36 @@ Call the Queries tool
 </Format>
 """
 
+follow_up_query_predictor_instructions="""You are an expert technical writer anticipating what research a report section will still be missing.
+
+<Report topic>
+{topic}
+</Report topic>
+
+<Section topic>
+{section_topic}
+</Section topic>
+
+<Queries already searched>
+{previous_queries}
+</Queries already searched>
+
+<Task>
+A first draft of this section is being written from the results of the queries above.
+Predict the gaps a reviewer is most likely to find in it, and generate {number_of_queries} follow-up search queries that would fill them.
+
+The queries should:
+
+1. Not repeat the queries already searched
+2. Target specific facts, figures, examples or recent developments the section will need
+
+</Task>
+
+<Format>
+Call the Queries tool 
+</Format>
+"""
+
 section_writer_instructions = """Write one section of a research report.
 
 <Task>
@@ -0,0 +1,68 @@
+import inspect
+import os
+from typing import Awaitable, Callable, List, Optional, Union
+
+from open_deep_research.state import Section
+
+SECTION_SEPARATOR = "\n\n"
+
+
+class ReportAssembler:
+    """
+    Assemble the final report incrementally, in plan order, as sections complete.
+
+    Sections finish out of order (research sections run in parallel, final sections are
+    written last). A completed section is held back until every section before it in the
+    plan is done; then it and any contiguous run of held-back successors are emitted:
+    appended to the on-disk report and passed to the on_section callback.
+
+    The assembled text is identical to what compile_final_report produces.
+
+    Args:
+        sections: The planned sections, in report order
+        path: Optional file the report is appended to as sections are emitted (truncated on start)
+        on_section: Optional callback, sync or async, called with each emitted section
+    """
+
+    def __init__(self, sections: List[Section], path: Optional[str] = None,
+                 on_section: Optional[Callable[[Section], Union[None, Awaitable[None]]]] = None):
+        self.order = [s.name for s in sections]
+        self.path = path
+        self.on_section = on_section
+        self._completed: dict[str, Section] = {}
+        self._emitted: List[Section] = []
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "w", encoding="utf-8").close()
+
+    @property
+    def done(self) -> bool:
+        return len(self._emitted) == len(self.order)
+
+    @property
+    def report(self) -> str:
+        """The report assembled from the sections emitted so far."""
+        return SECTION_SEPARATOR.join(s.content for s in self._emitted)
+
+    async def add(self, section: Section) -> List[Section]:
+        """Record a completed section and emit every section that is now ready, in order."""
+        self._completed[section.name] = section
+        ready = []
+        while not self.done and self.order[len(self._emitted)] in self._completed:
+            next_section = self._completed[self.order[len(self._emitted)]]
+            self._write(next_section, first=not self._emitted)
+            self._emitted.append(next_section)
+            ready.append(next_section)
+            if self.on_section is not None:
+                result = self.on_section(next_section)
+                if inspect.isawaitable(result):
+                    await result
+        return ready
+
+    def _write(self, section: Section, first: bool):
+        if not self.path:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            if not first:
+                f.write(SECTION_SEPARATOR)
+            f.write(section.content)
@@ -0,0 +1,157 @@
+import asyncio
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class ProviderStats:
+    """Latency and failure statistics for one search provider."""
+    ewma_latency: Optional[float] = None
+    samples: deque = field(default_factory=lambda: deque(maxlen=100))
+    consecutive_failures: int = 0
+    open_until: float = 0.0  # Circuit breaker: provider is skipped until this time
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < 5:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class SearchExecutor:
+    """
+    Latency-aware execution of a search across a primary and backup providers.
+
+    - Every call is bounded by a deadline
+    - If the primary hasn't answered by its p95 latency (or hedge_after seconds while there
+      is no history yet), a hedged request goes to the next provider and the first
+      successful answer wins; if the primary fails outright, the backup starts immediately
+    - Per-provider latency is tracked as an EWMA plus a window of recent samples for p95
+    - After failure_threshold consecutive failures a provider is ejected for cooldown seconds
+
+    Args:
+        alpha: EWMA smoothing factor
+        hedge_after: Hedge delay in seconds used until a provider has latency history
+        failure_threshold: Consecutive failures (errors or timeouts) that open the breaker
+        cooldown: Seconds an ejected provider is skipped
+    """
+
+    def __init__(self, alpha: float = 0.2, hedge_after: float = 10.0, failure_threshold: int = 3, cooldown: float = 60.0):
+        self.alpha = alpha
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.stats: Dict[str, ProviderStats] = {}
+
+    def _stats(self, provider: str) -> ProviderStats:
+        return self.stats.setdefault(provider, ProviderStats())
+
+    def is_available(self, provider: str) -> bool:
+        return time.monotonic() >= self._stats(provider).open_until
+
+    def record_success(self, provider: str, latency: float):
+        stats = self._stats(provider)
+        stats.samples.append(latency)
+        stats.ewma_latency = latency if stats.ewma_latency is None else \
+            self.alpha * latency + (1 - self.alpha) * stats.ewma_latency
+        stats.consecutive_failures = 0
+
+    def record_failure(self, provider: str):
+        stats = self._stats(provider)
+        stats.consecutive_failures += 1
+        if stats.consecutive_failures >= self.failure_threshold:
+            stats.open_until = time.monotonic() + self.cooldown
+            stats.consecutive_failures = 0
+            print(f"Search provider {provider} ejected for {self.cooldown:.0f}s after repeated failures")
+
+    def hedge_delay(self, provider: str) -> float:
+        return self._stats(provider).p95() or self.hedge_after
+
+    async def execute(self, call: Callable[[str], Awaitable[T]], providers: List[str], deadline: Optional[float] = None,
+                      acquire: Optional[Callable[[str], Awaitable[None]]] = None) -> T:
+        """
+        Run call(provider) for the first provider, hedging onto the following ones.
+
+        Providers whose circuit breaker is open are skipped, unless none is available.
+        acquire(provider), e.g. waiting for a rate limiter, runs before each call. Its wait
+        counts towards the deadline but not towards the provider's latency or hedge delay,
+        and a provider still waiting in it at the deadline is not marked as failed.
+
+        Raises:
+            asyncio.TimeoutError: If no provider answered before the deadline
+            Exception: The last provider error if every provider failed
+        """
+        candidates = [p for p in providers if self.is_available(p)] or providers[:1]
+        loop = asyncio.get_running_loop()
+        stop_at = loop.time() + deadline if deadline is not None else None
+        # Task -> [provider, time the call started (None while acquire is still waiting)]
+        running: Dict[asyncio.Task, list] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> list:
+            attempt = [candidates.pop(0), None]
+
+            async def run():
+                if acquire is not None:
+                    await acquire(attempt[0])
+                attempt[1] = loop.time()
+                return await call(attempt[0])
+
+            running[asyncio.ensure_future(run())] = attempt
+            return attempt
+
+        current = launch()
+        try:
+            while running:
+                remaining = stop_at - loop.time() if stop_at is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                # Wake up at the hedge point of the most recently launched provider, if there is a backup left
+                # (measured from the start of its call, or from now while it still waits in acquire)
+                hedge_at = (current[1] if current[1] is not None else loop.time()) + self.hedge_delay(current[0])
+                timeout = remaining
+                if candidates:
+                    hedge_in = max(0.0, hedge_at - loop.time())
+                    timeout = hedge_in if timeout is None else min(timeout, hedge_in)
+
+                done, _ = await asyncio.wait(list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider, started = running.pop(task)
+                    if task.exception() is None:
+                        self.record_success(provider, loop.time() - started)
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"Search provider {provider} failed: {last_error}")
+                    self.record_failure(provider)
+
+                # Hedge once the latest request is slower than usual, or fail over as soon as it errors
+                current_running = any(attempt is current for attempt in running.values())
+                slow = current[1] is not None and loop.time() >= current[1] + self.hedge_delay(current[0])
+                if candidates and (not current_running or slow):
+                    current = launch()
+        finally:
+            for task in running:
+                task.cancel()
+
+        if running:
+            for provider, started in running.values():
+                if started is not None:
+                    self.record_failure(provider)
+            raise asyncio.TimeoutError(f"Search did not finish within {deadline}s ({', '.join(p for p, _ in running.values())})")
+        raise last_error
+
+
+_search_executor: Optional[SearchExecutor] = None
+
+
+def get_search_executor() -> SearchExecutor:
+    """Return the search executor whose provider statistics are shared by the whole process."""
+    global _search_executor
+    if _search_executor is None:
+        _search_executor = SearchExecutor()
+    return _search_executor
@@ -6,8 +6,15 @@ import concurrent
 import aiohttp
 import httpx
 import time
+import hashlib
+import json
+import threading
+import functools
+import math
+import re
+from collections import Counter
 from typing import List, Optional, Dict, Any, Union, Literal
-from urllib.parse import unquote
+from urllib.parse import unquote, urlsplit, urlunsplit, parse_qsl, urlencode
 
 from exa_py import Exa
 from linkup import LinkupClient
@@ -22,23 +29,90 @@ from markdownify import markdownify
 
 from langchain_community.retrievers import ArxivRetriever
 from langchain_community.utilities.pubmed import PubMedAPIWrapper
-from langchain_core.tools import tool
+from langchain.chat_models import init_chat_model
+from langchain_core.tools import tool, StructuredTool
+from langchain_core.rate_limiters import InMemoryRateLimiter
 
 from langsmith import traceable
 
 from open_deep_research.state import Section
+from open_deep_research.page_cache import get_page_cache
+from open_deep_research.search_executor import get_search_executor
     
 def get_config_value(value):
     """
     Helper function to handle string, dict, and enum cases of configuration values
     """
-    if isinstance(value, str):
+    if value is None or isinstance(value, str):
         return value
     elif isinstance(value, dict):
         return value
     else:
         return value.value
 
+# Process-wide registry of chat model clients, keyed by (provider, model, kwargs)
+_chat_models: Dict[str, Any] = {}
+_chat_models_lock = threading.Lock()
+
+def _model_registry_key(*parts) -> str:
+    return json.dumps(parts, sort_keys=True, default=repr)
+
+# Process-wide token buckets, one per LLM provider and per search provider
+_rate_limiters: Dict[str, InMemoryRateLimiter] = {}
+
+def get_rate_limiter(name: str, requests_per_second: float) -> InMemoryRateLimiter:
+    """
+    Return the token bucket shared by every caller of a provider.
+
+    All section subgraphs draw from the same bucket, so the combined request rate stays at the
+    provider's limit instead of bursting into 429s and backing off.
+    """
+    key = f"{name}@{requests_per_second}"
+    with _chat_models_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = InMemoryRateLimiter(requests_per_second=requests_per_second,
+                                                                check_every_n_seconds=0.05,
+                                                                max_bucket_size=1)
+        return limiter
+
+def get_chat_model(model: str, model_provider: Optional[str] = None, requests_per_second: Optional[float] = None, **kwargs):
+    """
+    Return a shared chat model client for the given provider, model and init kwargs.
+
+    Graph nodes run once per section and per reflection loop; reusing one client per
+    configuration keeps its HTTP connection pool warm instead of building a new one each time.
+
+    Args:
+        model: Model name, optionally prefixed with the provider (e.g. "openai:gpt-4.1")
+        model_provider: Provider name passed to init_chat_model
+        requests_per_second: Optional rate limit shared by every client of the provider
+        **kwargs: Any other init_chat_model keyword arguments
+
+    Returns:
+        BaseChatModel: The shared client
+    """
+    if requests_per_second:
+        provider = model_provider or (model.split(":", 1)[0] if ":" in model else model)
+        kwargs["rate_limiter"] = get_rate_limiter(f"llm:{provider}", requests_per_second)
+    key = _model_registry_key(model_provider, model, kwargs)
+    with _chat_models_lock:
+        llm = _chat_models.get(key)
+        if llm is None:
+            llm = _chat_models[key] = init_chat_model(model=model, model_provider=model_provider, **kwargs)
+        return llm
+
+def get_structured_model(schema, model: str, model_provider: Optional[str] = None, requests_per_second: Optional[float] = None, **kwargs):
+    """Return a shared with_structured_output(schema) runnable built on get_chat_model."""
+    key = _model_registry_key(f"{schema.__module__}.{schema.__qualname__}", model_provider, model, requests_per_second, kwargs)
+    with _chat_models_lock:
+        structured_llm = _chat_models.get(key)
+    if structured_llm is None:
+        structured_llm = get_chat_model(model, model_provider, requests_per_second, **kwargs).with_structured_output(schema)
+        with _chat_models_lock:
+            structured_llm = _chat_models.setdefault(key, structured_llm)
+    return structured_llm
+
 def get_search_params(search_api: str, search_api_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Filters the search_api_config dictionary to include only parameters accepted by the specified search API.
@@ -59,6 +133,8 @@ def get_search_params(search_api: str, search_api_config: Optional[Dict[str, Any
         "pubmed": ["top_k_results", "email", "api_key", "doc_content_chars_max"],
         "linkup": ["depth"],
         "googlesearch": ["max_results"],
+        "azureaisearch": ["max_results", "topic"],
+        "fanout": ["providers", "quorum", "deadline", "provider_params"],
     }
 
     # Get the list of accepted parameters for the given search API
@@ -71,15 +147,224 @@ def get_search_params(search_api: str, search_api_config: Optional[Dict[str, Any
     # Filter the config to only include accepted parameters
     return {k: v for k, v in search_api_config.items() if k in accepted_params}
 
+# Query parameters that only track the visitor and never change the page content
+TRACKING_QUERY_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref", "ref_src", "spm",
+}
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalise a URL so that trivially different spellings of the same page compare equal.
+
+    Lowercases the scheme and host, treats http and https as the same page, drops default
+    ports, "www." prefixes, fragments, tracking query parameters (utm_*, gclid, ...) and
+    trailing slashes, and sorts the remaining query parameters.
+
+    Args:
+        url (str): The URL as returned by a search API
+
+    Returns:
+        str: Canonical form of the URL, only meant to be used as a deduplication key
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_QUERY_PARAMS
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+def simhash(text: str, bits: int = 64) -> int:
+    """
+    Compute a SimHash fingerprint of a text from its 3-word shingles.
+
+    Texts that share most of their shingles get fingerprints with a small Hamming distance,
+    which lets the same article served at different URLs be detected cheaply.
+    """
+    words = text.lower().split()
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    weights = [0] * bits
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(bits):
+            weights[i] += 1 if h >> i & 1 else -1
+    return sum(1 << i for i, w in enumerate(weights) if w > 0)
+
+def deduplicate_sources(
+    sources_list: List[dict],
+    deduplication_strategy: Literal["keep_first", "keep_last"] = "keep_first",
+    near_duplicate_threshold: Optional[int] = None,
+) -> List[dict]:
+    """
+    Deduplicate search results by canonical URL and, optionally, by near-duplicate content.
+
+    Args:
+        sources_list: Search result dicts with at least 'url' and 'content' fields
+        deduplication_strategy: Whether to keep the first or last search result for each unique URL
+        near_duplicate_threshold: If set, drop results whose SimHash fingerprint is within this
+            Hamming distance of an already kept result (3 is a sensible value for 64-bit hashes)
+
+    Returns:
+        List[dict]: Unique results in the order their URL was first seen
+    """
+    if deduplication_strategy not in ("keep_first", "keep_last"):
+        raise ValueError(f"Invalid deduplication strategy: {deduplication_strategy}")
+
+    unique_sources = {}
+    for source in sources_list:
+        key = canonicalize_url(source['url'])
+        if key not in unique_sources or deduplication_strategy == "keep_last":
+            unique_sources[key] = source
+
+    if near_duplicate_threshold is None:
+        return list(unique_sources.values())
+
+    kept, fingerprints = [], []
+    for source in unique_sources.values():
+        text = source.get('raw_content') or source.get('content') or ''
+        # Very short snippets produce unstable fingerprints, so only URL deduplication applies
+        if len(text.split()) < 50:
+            kept.append(source)
+            continue
+        fingerprint = simhash(text)
+        if any(bin(fingerprint ^ other).count("1") <= near_duplicate_threshold for other in fingerprints):
+            continue
+        fingerprints.append(fingerprint)
+        kept.append(source)
+    return kept
+
+@functools.lru_cache(maxsize=1)
+def _get_token_encoding():
+    """Load the tiktoken encoding once, or None if tiktoken (or its data files) is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """Count the tokens in a text with tiktoken, falling back to ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _get_token_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_token_budget(text: str, max_tokens: int) -> str:
+    """
+    Truncate a text to at most max_tokens tokens, cutting at a paragraph or sentence boundary.
+
+    Falls back to a sentence boundary if no paragraph break is found in the second half of the
+    allowed prefix, and to a word boundary if there is no sentence boundary either.
+
+    Args:
+        text (str): Text to truncate
+        max_tokens (int): Token budget for the text
+
+    Returns:
+        str: The text itself if it fits, otherwise a truncated prefix ending in "... [truncated]"
+    """
+    if not text or max_tokens <= 0:
+        return ""
+    encoding = _get_token_encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        prefix = text[:max_tokens * 4]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        prefix = encoding.decode(tokens[:max_tokens])
+
+    # Prefer the last paragraph break, then the last sentence end, as long as it keeps half the prefix
+    cut = prefix.rfind("\n\n")
+    if cut < len(prefix) // 2:
+        sentence_ends = [m.end() for m in re.finditer(r"[.!?][\"')\]]?(?=\s)", prefix)]
+        cut = sentence_ends[-1] if sentence_ends else -1
+    if cut < len(prefix) // 2:
+        cut = prefix.rfind(" ")
+    if cut < len(prefix) // 2:
+        cut = len(prefix)
+    return prefix[:cut].rstrip() + "... [truncated]"
+
+def allocate_token_budget(sources: List[dict], total_budget: int, min_tokens_per_source: int = 200) -> List[int]:
+    """
+    Split one global token budget across sources in proportion to their relevance score.
+
+    Every source with content first gets min_tokens_per_source (scaled down when the budget
+    cannot cover that many sources) and the rest of the budget is shared by score. Sources
+    that need less than their share (short pages) give the surplus back to the remaining
+    sources, so the budget is filled as far as the available content allows without ever
+    exceeding it. Sources without a score get the lowest score seen, or equal weights if
+    none are scored.
+
+    Args:
+        sources: Search result dicts with 'raw_content' and an optional 'score'
+        total_budget: Total number of tokens available for all raw contents
+        min_tokens_per_source: Smallest budget given to any source that has content
+
+    Returns:
+        List[int]: Token budget for each source, in the same order
+    """
+    needs = [estimate_tokens(source.get('raw_content') or '') for source in sources]
+    scores = [source.get('score') for source in sources]
+    known = [s for s in scores if isinstance(s, (int, float)) and s > 0]
+    floor = min(known) if known else 1.0
+    weights = [s if isinstance(s, (int, float)) and s > 0 else floor for s in scores]
+
+    budgets = [0] * len(sources)
+    pending = [i for i, need in enumerate(needs) if need > 0]
+    remaining = total_budget
+    # Water-filling: sources whose need fits in their share are settled, the rest share what is left.
+    # Shares never add up to more than what is left, so the settled sources cannot overspend.
+    while pending:
+        floor = min(min_tokens_per_source, remaining // len(pending))
+        spare = remaining - floor * len(pending)
+        total_weight = sum(weights[i] for i in pending)
+        shares = {i: floor + int(spare * weights[i] / total_weight) for i in pending}
+        settled = [i for i in pending if needs[i] <= shares[i]]
+        if not settled:
+            break
+        for i in settled:
+            budgets[i] = needs[i]
+            remaining -= needs[i]
+        pending = [i for i in pending if i not in settled]
+    for i in pending:
+        budgets[i] = shares[i]
+    return budgets
+
 def deduplicate_and_format_sources(
     search_response,
     max_tokens_per_source=5000,
     include_raw_content=True,
-    deduplication_strategy: Literal["keep_first", "keep_last"] = "keep_first"
+    deduplication_strategy: Literal["keep_first", "keep_last"] = "keep_first",
+    near_duplicate_threshold: Optional[int] = None,
+    total_token_budget: Optional[int] = None
 ):
     """
     Takes a list of search responses and formats them into a readable string.
-    Limits the raw_content to approximately max_tokens_per_source tokens.
+    Limits the raw_content to max_tokens_per_source tokens, or splits total_token_budget
+    across sources by relevance score when it is given.
  
     Args:
         search_responses: List of search response dicts, each containing:
@@ -93,47 +378,193 @@ def deduplicate_and_format_sources(
         max_tokens_per_source: int
         include_raw_content: bool
         deduplication_strategy: Whether to keep the first or last search result for each unique URL
+        near_duplicate_threshold: Optional SimHash Hamming distance for dropping near-duplicate content
+        total_token_budget: Optional token budget shared by the raw content of all sources
     Returns:
         str: Formatted string with deduplicated sources
     """
-     # Collect all results
+    # Collect all results
     sources_list = []
     for response in search_response:
         sources_list.extend(response['results'])
 
-    # Deduplicate by URL
-    if deduplication_strategy == "keep_first":
-        unique_sources = {}
-        for source in sources_list:
-            if source['url'] not in unique_sources:
-                unique_sources[source['url']] = source
-    elif deduplication_strategy == "keep_last":
-        unique_sources = {source['url']: source for source in sources_list}
-    else:
-        raise ValueError(f"Invalid deduplication strategy: {deduplication_strategy}")
+    # Deduplicate by canonical URL (and optionally by content)
+    unique_sources = deduplicate_sources(sources_list, deduplication_strategy, near_duplicate_threshold)
 
-    # Format output
-    formatted_text = "Content from sources:\n"
-    for i, source in enumerate(unique_sources.values(), 1):
-        formatted_text += f"{'='*80}\n"  # Clear section separator
-        formatted_text += f"Source: {source['title']}\n"
-        formatted_text += f"{'-'*80}\n"  # Subsection separator
-        formatted_text += f"URL: {source['url']}\n===\n"
-        formatted_text += f"Most relevant content from source: {source['content']}\n===\n"
+    # Token budget for each source's raw content
+    if total_token_budget is not None:
+        budgets = allocate_token_budget(unique_sources, total_token_budget)
+    else:
+        budgets = [max_tokens_per_source] * len(unique_sources)
+
+    # Format output into a list of parts and join once at the end
+    parts = ["Content from sources:\n"]
+    for source, budget in zip(unique_sources, budgets):
+        parts.append(f"{'='*80}\n")  # Clear section separator
+        parts.append(f"Source: {source['title']}\n")
+        parts.append(f"{'-'*80}\n")  # Subsection separator
+        parts.append(f"URL: {source['url']}\n===\n")
+        parts.append(f"Most relevant content from source: {source['content']}\n===\n")
         if include_raw_content:
-            # Using rough estimate of 4 characters per token
-            char_limit = max_tokens_per_source * 4
             # Handle None raw_content
             raw_content = source.get('raw_content', '')
             if raw_content is None:
                 raw_content = ''
                 print(f"Warning: No raw_content found for source {source['url']}")
-            if len(raw_content) > char_limit:
-                raw_content = raw_content[:char_limit] + "... [truncated]"
-            formatted_text += f"Full source content limited to {max_tokens_per_source} tokens: {raw_content}\n\n"
-        formatted_text += f"{'='*80}\n\n" # End section separator
+            parts.append(f"Full source content limited to {budget} tokens: ")
+            parts.append(truncate_to_token_budget(raw_content, budget))
+            parts.append("\n\n")
+        parts.append(f"{'='*80}\n\n") # End section separator
                 
-    return formatted_text.strip()
+    return "".join(parts).strip()
+
+def format_search_results(search_results, max_chars_per_source: int = 30000) -> str:
+    """
+    Format raw search responses into the source listing returned by the search tools.
+
+    Args:
+        search_results: List of search response dicts with a 'results' list each
+        max_chars_per_source: Maximum characters of raw content to include per source
+
+    Returns:
+        str: A formatted string of deduplicated search results
+    """
+    sources_list = [result for response in search_results for result in response['results']]
+    unique_results = deduplicate_sources(sources_list)
+    if not unique_results:
+        return "No valid search results found. Please try different search queries or use a different search API."
+
+    parts = ["Search results: \n\n"]
+    for i, result in enumerate(unique_results):
+        parts.append(f"\n\n--- SOURCE {i+1}: {result['title']} ---\n")
+        parts.append(f"URL: {result['url']}\n\n")
+        parts.append(f"SUMMARY:\n{result['content']}\n\n")
+        if result.get('raw_content'):
+            parts.append("FULL CONTENT:\n")
+            parts.append(result['raw_content'][:max_chars_per_source])  # Limit content size
+        parts.append("\n\n" + "-" * 80 + "\n")
+    return "".join(parts)
+
+# Common English words that carry no signal for passage ranking
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "what when which who will with how why does do not can their they them these those than".split()
+)
+
+# Start of a source block in the output of deduplicate_and_format_sources and the search tools
+_SOURCE_BLOCK_START = re.compile(r"(?m)(?=^={80}\nSource: )|(?=^\n*--- SOURCE \d+: )")
+# Separator lines that carry no content
+_SEPARATOR_LINE = re.compile(r"(?m)^(?:[=\-]{3,}|FULL CONTENT:|SUMMARY:)\s*$")
+# Labels that deduplicate_and_format_sources puts in front of the content on the same line
+_CONTENT_LABEL = re.compile(r"(?m)^(?:Most relevant content from source|Full source content limited to \d+ tokens): ?")
+
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+def split_into_passages(text: str, max_words: int = 120) -> List[str]:
+    """
+    Split a page into passages of at most roughly max_words words.
+
+    Consecutive short paragraphs are merged and overly long paragraphs are cut into
+    fixed-size word windows, so every passage carries a comparable amount of text.
+    Separator lines and the content labels of formatted sources are left out.
+    """
+    passages, current, current_words = [], [], 0
+    text = _CONTENT_LABEL.sub("", _SEPARATOR_LINE.sub("", text))
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        if not words:
+            continue
+        if current and current_words + len(words) > max_words:
+            passages.append("\n".join(current))
+            current, current_words = [], 0
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.append(" ".join(words))
+        current_words += len(words)
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+def bm25_scores(passages: List[str], query: str, k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Score passages against a query with Okapi BM25."""
+    docs = [Counter(_terms(p)) for p in passages]
+    if not docs:
+        return []
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) or 1.0
+    query_terms = set(_terms(query))
+    doc_freq = {t: sum(1 for d in docs if t in d) for t in query_terms}
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for t in query_terms:
+            tf = d.get(t, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_len))
+        scores.append(score)
+    return scores
+
+def extract_relevant_passages(source_str: str, queries: List[str], max_passages: int = 30, max_words: int = 120) -> str:
+    """
+    Reduce a formatted source string to the passages most relevant to the given queries.
+
+    Each source block keeps its title/URL header and the top-ranked passages (by BM25 against
+    all queries combined) are re-emitted under it, in their original order. Sources with no
+    selected passage are dropped.
+
+    Args:
+        source_str: Output of select_and_execute_search
+        queries: Section description and search queries to rank passages against
+        max_passages: Total number of passages to keep across all sources
+        max_words: Approximate passage length in words
+
+    Returns:
+        str: The condensed source string, or source_str itself if it is already small enough
+    """
+    blocks = [block for block in _SOURCE_BLOCK_START.split(source_str) if block.strip()]
+    preamble = blocks.pop(0) if blocks and not _SOURCE_BLOCK_START.match(blocks[0]) and len(blocks) > 1 else ""
+
+    # Split every block into header (up to and including the URL line) and passages
+    parsed, candidates = [], []
+    for block_idx, block in enumerate(blocks):
+        match = re.search(r"(?m)^URL: .*$", block)
+        header, body = (block[:match.end()], block[match.end():]) if match else ("", block)
+        parsed.append("\n".join(line for line in header.splitlines() if line.strip() and not _SEPARATOR_LINE.match(line)))
+        for passage in split_into_passages(body, max_words):
+            candidates.append((block_idx, passage))
+
+    if len(candidates) <= max_passages:
+        return source_str
+
+    scores = bm25_scores([p for _, p in candidates], " ".join(queries))
+    top = sorted(sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:max_passages])
+
+    selected: Dict[int, List[str]] = {}
+    for i in top:
+        block_idx, passage = candidates[i]
+        selected.setdefault(block_idx, []).append(passage)
+
+    parts = [preamble.strip() + "\n"] if preamble.strip() else []
+    for block_idx, passages in selected.items():
+        parts.append(f"{'='*80}\n{parsed[block_idx]}\nRelevant passages:\n")
+        parts.append("\n...\n".join(passages))
+        parts.append(f"\n{'='*80}\n\n")
+    return "".join(parts).strip()
+
+def source_coverage(source_str: str, text: str) -> float:
+    """
+    Fraction of the distinct key terms of text that appear anywhere in the sources.
+
+    A cheap proxy for whether the search results already cover what a section is about.
+    """
+    terms = set(_terms(text))
+    if not terms:
+        return 1.0
+    return len(terms & set(_terms(source_str))) / len(terms)
 
 def format_sections(sections: list[Section]) -> str:
     """ Format a list of sections into a string """
@@ -1096,6 +1527,7 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                 # If requested, fetch full page content asynchronously (for both API and web scraping)
                 if include_raw_content and results:
                     content_semaphore = asyncio.Semaphore(3)
+                    page_cache = get_page_cache()
                     
                     async with aiohttp.ClientSession() as session:
                         fetch_tasks = []
@@ -1107,27 +1539,35 @@ async def google_search_async(search_queries: Union[str, List[str]], max_results
                                     'User-Agent': get_useragent(),
                                     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
                                 }
-                                
+
                                 try:
-                                    await asyncio.sleep(0.2 + random.random() * 0.6)
-                                    async with session.get(url, headers=headers, timeout=10) as response:
-                                        if response.status == 200:
-                                            # Check content type to handle binary files
-                                            content_type = response.headers.get('Content-Type', '').lower()
-                                            
-                                            # Handle PDFs and other binary files
-                                            if 'application/pdf' in content_type or 'application/octet-stream' in content_type:
-                                                # For PDFs, indicate that content is binary and not parsed
-                                                result['raw_content'] = f"[Binary content: {content_type}. Content extraction not supported for this file type.]"
-                                            else:
-                                                try:
-                                                    # Try to decode as UTF-8 with replacements for non-UTF8 characters
-                                                    html = await response.text(errors='replace')
-                                                    soup = BeautifulSoup(html, 'html.parser')
-                                                    result['raw_content'] = soup.get_text()
-                                                except UnicodeDecodeError as ude:
-                                                    # Fallback if we still have decoding issues
-                                                    result['raw_content'] = f"[Could not decode content: {str(ude)}]"
+                                    # Serve popular pages from the shared page cache, revalidating stale entries
+                                    cached = page_cache.lookup(url)
+                                    if cached is None:
+                                        await asyncio.sleep(0.2 + random.random() * 0.6)
+                                        # If the entry is evicted before a 304 arrives, fetch the page again in full
+                                        for conditional in (page_cache.conditional_headers(url), {}):
+                                            async with session.get(url, headers={**headers, **conditional}, timeout=10) as response:
+                                                if response.status == 304:
+                                                    cached = page_cache.revalidated(url)
+                                                    if cached is None and conditional:
+                                                        continue
+                                                elif response.status == 200:
+                                                    # Check content type to handle binary files
+                                                    content_type = response.headers.get('Content-Type', '').lower()
+
+                                                    # Handle PDFs and other binary files
+                                                    if 'application/pdf' in content_type or 'application/octet-stream' in content_type:
+                                                        # For PDFs, indicate that content is binary and not parsed
+                                                        result['raw_content'] = f"[Binary content: {content_type}. Content extraction not supported for this file type.]"
+                                                    else:
+                                                        cached = page_cache.store(url, await response.read(), dict(response.headers))
+                                            break
+                                    if cached is not None:
+                                        # Extracted text is cached alongside the raw body
+                                        result['raw_content'] = page_cache.extract(
+                                            cached, "text", lambda page: BeautifulSoup(page.text(), 'html.parser').get_text()
+                                        )
                                 except Exception as e:
                                     print(f"Warning: Failed to fetch content for {url}: {str(e)}")
                                     result['raw_content'] = f"[Error fetching content: {str(e)}]"
@@ -1189,6 +1629,39 @@ async def scrape_pages(titles: List[str], urls: List[str]) -> str:
              with clear section dividers and source attribution
     """
     
+    pages = await fetch_pages_markdown(urls)
+
+    # Create formatted output
+    formatted_output = f"Search results: \n\n"
+
+    for i, (title, url, page) in enumerate(zip(titles, urls, pages)):
+        formatted_output += f"\n\n--- SOURCE {i+1}: {title} ---\n"
+        formatted_output += f"URL: {url}\n\n"
+        formatted_output += f"FULL CONTENT:\n {page}"
+        formatted_output += "\n\n" + "-" * 80 + "\n"
+
+    return formatted_output
+
+async def fetch_pages_markdown(urls: List[str]) -> List[str]:
+    """
+    Fetch pages through the shared page cache and convert them to markdown.
+
+    Args:
+        urls (List[str]): URLs to fetch
+
+    Returns:
+        List[str]: The markdown of each page, or an error message for pages that could not be fetched
+    """
+    page_cache = get_page_cache()
+
+    def to_markdown(page):
+        # Handle different content types
+        if 'text/html' in page.content_type:
+            # Convert HTML to markdown
+            return markdownify(page.text())
+        # For non-HTML content, just mention the content type
+        return f"Content type: {page.content_type} (not converted to markdown)"
+
     # Create an async HTTP client
     async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as client:
         pages = []
@@ -1196,48 +1669,36 @@ async def scrape_pages(titles: List[str], urls: List[str]) -> str:
         # Fetch each URL and convert to markdown
         for url in urls:
             try:
-                # Fetch the content
-                response = await client.get(url)
-                response.raise_for_status()
-                
-                # Convert HTML to markdown if successful
-                if response.status_code == 200:
-                    # Handle different content types
-                    content_type = response.headers.get('Content-Type', '')
-                    if 'text/html' in content_type:
-                        # Convert HTML to markdown
-                        markdown_content = markdownify(response.text)
-                        pages.append(markdown_content)
-                    else:
-                        # For non-HTML content, just mention the content type
-                        pages.append(f"Content type: {content_type} (not converted to markdown)")
-                else:
-                    pages.append(f"Error: Received status code {response.status_code}")
+                # Serve from the shared page cache, revalidating stale entries with a conditional GET
+                cached = page_cache.lookup(url)
+                if cached is None:
+                    response = await client.get(url, headers=page_cache.conditional_headers(url))
+                    if response.status_code == 304:
+                        cached = page_cache.revalidated(url)
+                        if cached is None:
+                            # The entry was evicted since the headers were built; fetch the page in full
+                            response = await client.get(url)
+                    if cached is None:
+                        response.raise_for_status()
+                        cached = page_cache.store(url, response.content, dict(response.headers))
+
+                pages.append(page_cache.extract(cached, "markdown", to_markdown))
         
             except Exception as e:
                 # Handle any exceptions during fetch
                 pages.append(f"Error fetching URL: {str(e)}")
-        
-        # Create formatted output
-        formatted_output = f"Search results: \n\n"
-        
-        for i, (title, url, page) in enumerate(zip(titles, urls, pages)):
-            formatted_output += f"\n\n--- SOURCE {i+1}: {title} ---\n"
-            formatted_output += f"URL: {url}\n\n"
-            formatted_output += f"FULL CONTENT:\n {page}"
-            formatted_output += "\n\n" + "-" * 80 + "\n"
-        
-    return formatted_output
 
-@tool
-async def duckduckgo_search(search_queries: List[str]):
+    return pages
+
+@traceable
+async def duckduckgo_search_async(search_queries: List[str]) -> List[dict]:
     """Perform searches using DuckDuckGo with retry logic to handle rate limits
     
     Args:
         search_queries (List[str]): List of search queries to process
         
     Returns:
-        str: A formatted string of search results
+        List[dict]: List of search responses, one per query, in the same format as Tavily
     """
     
     async def process_single_query(query):
@@ -1315,8 +1776,6 @@ async def duckduckgo_search(search_queries: List[str]):
 
     # Process queries with delay between them to reduce rate limiting
     search_docs = []
-    urls = []
-    titles = []
     for i, query in enumerate(search_queries):
         # Add delay between queries (except first one)
         if i > 0:
@@ -1324,15 +1783,30 @@ async def duckduckgo_search(search_queries: List[str]):
             await asyncio.sleep(delay)
         
         # Process the query
-        result = await process_single_query(query)
-        search_docs.append(result)
+        search_docs.append(await process_single_query(query))
+
+    return search_docs
+
+@tool
+async def duckduckgo_search(search_queries: List[str]):
+    """Perform searches using DuckDuckGo with retry logic to handle rate limits
+    
+    Args:
+        search_queries (List[str]): List of search queries to process
         
-        # Safely extract URLs and titles from results, handling empty result cases
-        if result['results'] and len(result['results']) > 0:
-            for res in result['results']:
-                if 'url' in res and 'title' in res:
-                    urls.append(res['url'])
-                    titles.append(res['title'])
+    Returns:
+        str: A formatted string of search results
+    """
+    search_docs = await duckduckgo_search_async(search_queries)
+
+    # Safely extract URLs and titles from results, handling empty result cases
+    urls = []
+    titles = []
+    for result in search_docs:
+        for res in result['results']:
+            if 'url' in res and 'title' in res:
+                urls.append(res['url'])
+                titles.append(res['title'])
     
     # If we got any valid URLs, scrape the pages
     if urls:
@@ -1362,29 +1836,7 @@ async def tavily_search(queries: List[str], max_results: int = 5, topic: Literal
     )
 
     # Format the search results directly using the raw_content already provided
-    formatted_output = f"Search results: \n\n"
-    
-    # Deduplicate results by URL
-    unique_results = {}
-    for response in search_results:
-        for result in response['results']:
-            url = result['url']
-            if url not in unique_results:
-                unique_results[url] = result
-    
-    # Format the unique results
-    for i, (url, result) in enumerate(unique_results.items()):
-        formatted_output += f"\n\n--- SOURCE {i+1}: {result['title']} ---\n"
-        formatted_output += f"URL: {url}\n\n"
-        formatted_output += f"SUMMARY:\n{result['content']}\n\n"
-        if result.get('raw_content'):
-            formatted_output += f"FULL CONTENT:\n{result['raw_content'][:30000]}"  # Limit content size
-        formatted_output += "\n\n" + "-" * 80 + "\n"
-    
-    if unique_results:
-        return formatted_output
-    else:
-        return "No valid search results found. Please try different search queries or use a different search API."
+    return format_search_results(search_results)
 
 
 @tool
@@ -1407,68 +1859,160 @@ async def azureaisearch_search(queries: List[str], max_results: int = 5, topic:
     )
 
     # Format the search results directly using the raw_content already provided
-    formatted_output = f"Search results: \n\n"
-    
-    # Deduplicate results by URL
-    unique_results = {}
-    for response in search_results:
-        for result in response['results']:
-            url = result['url']
-            if url not in unique_results:
-                unique_results[url] = result
-    
-    # Format the unique results
-    for i, (url, result) in enumerate(unique_results.items()):
-        formatted_output += f"\n\n--- SOURCE {i+1}: {result['title']} ---\n"
-        formatted_output += f"URL: {url}\n\n"
-        formatted_output += f"SUMMARY:\n{result['content']}\n\n"
-        if result.get('raw_content'):
-            formatted_output += f"FULL CONTENT:\n{result['raw_content'][:30000]}"  # Limit content size
-        formatted_output += "\n\n" + "-" * 80 + "\n"
-    
-    if unique_results:
-        return formatted_output
-    else:
-        return "No valid search results found. Please try different search queries or use a different search API."
+    return format_search_results(search_results)
+
+
+async def _perplexity_search_async(search_queries):
+    # The Perplexity client is synchronous, keep it off the event loop
+    return await asyncio.to_thread(perplexity_search, search_queries)
+
+# Every search backend that returns raw search responses ({"query": ..., "results": [...]} per query)
+SEARCH_BACKENDS = {
+    "tavily": tavily_search_async,
+    "duckduckgo": duckduckgo_search_async,
+    "perplexity": _perplexity_search_async,
+    "exa": exa_search,
+    "arxiv": arxiv_search_async,
+    "pubmed": pubmed_search_async,
+    "linkup": linkup_search,
+    "googlesearch": google_search_async,
+    "azureaisearch": azureaisearch_search_async,
+}
+
+async def fanout_search(search_queries: List[str], providers: Optional[List[str]] = None, quorum: Optional[int] = None,
+                        deadline: Optional[float] = None, provider_params: Optional[Dict[str, Dict[str, Any]]] = None) -> List[dict]:
+    """
+    Query several search providers concurrently and merge their responses.
+
+    Returns as soon as quorum providers have answered successfully or the deadline has passed,
+    whichever comes first; providers that are still running are cancelled, so one slow provider
+    doesn't hold up the whole search. Results are deduplicated later, when they are formatted.
+
+    Args:
+        search_queries: List of search queries to run on every provider
+        providers: Search API names from SEARCH_BACKENDS (default: tavily and duckduckgo)
+        quorum: Number of successful providers to wait for (default: all of them)
+        deadline: Seconds to wait before returning whatever has arrived (default: no deadline)
+        provider_params: Optional extra parameters per provider, filtered with get_search_params
 
+    Returns:
+        List[dict]: The search responses of every provider that finished in time
+    """
+    providers = providers or ["tavily", "duckduckgo"]
+    unknown = [p for p in providers if p not in SEARCH_BACKENDS]
+    if unknown:
+        raise ValueError(f"Unsupported search API(s) for fan-out: {unknown}")
+    quorum = min(quorum or len(providers), len(providers))
+    provider_params = provider_params or {}
+
+    tasks = {
+        asyncio.create_task(SEARCH_BACKENDS[p](search_queries, **get_search_params(p, provider_params.get(p)))): p
+        for p in providers
+    }
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline if deadline is not None else None
+    search_results, succeeded = [], 0
+    pending = set(tasks)
+    try:
+        while pending and succeeded < quorum:
+            timeout = max(0.0, stop_at - loop.time()) if stop_at is not None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                print(f"Fan-out search deadline reached, skipping: {[tasks[t] for t in pending]}")
+                break
+            for task in done:
+                if task.exception() is not None:
+                    print(f"Fan-out search provider {tasks[task]} failed: {task.exception()}")
+                    continue
+                succeeded += 1
+                search_results.extend(task.result())
+    finally:
+        for task in pending:
+            task.cancel()
 
-async def select_and_execute_search(search_api: str, query_list: list[str], params_to_pass: dict) -> str:
+    return search_results
+
+def make_search_tool(search_api: str, params_to_pass: Optional[dict] = None, total_token_budget: Optional[int] = None):
+    """
+    Build an agent tool for any search API, including "fanout".
+
+    The tool takes a list of queries and returns the same formatted source string as
+    select_and_execute_search.
+    """
+    if search_api != "fanout" and search_api not in SEARCH_BACKENDS:
+        raise ValueError(f"Unsupported search API: {search_api}")
+
+    async def search(queries: List[str]) -> str:
+        return await select_and_execute_search(search_api, queries, params_to_pass or {}, total_token_budget)
+
+    return StructuredTool.from_function(
+        coroutine=search,
+        name=f"{search_api}_search",
+        description=(f"Search the web using {search_api}. "
+                     "Takes a list of search queries and returns formatted sources with their content."),
+    )
+
+async def select_and_execute_search(search_api: str, query_list: list[str], params_to_pass: dict, total_token_budget: Optional[int] = None,
+                                    backup_search_api: Optional[str] = None, deadline: Optional[float] = None,
+                                    requests_per_second: Optional[float] = None) -> str:
     """Select and execute the appropriate search API.
     
+    Searches go through the shared SearchExecutor: the call is bounded by deadline, a hedged
+    request goes to backup_search_api when the primary is slower than its p95 latency (or
+    fails), and a provider that keeps failing is skipped for a while. Like fanout_search, a
+    search that misses its deadline degrades to an empty source listing instead of failing
+    the research run.
+    
     Args:
         search_api: Name of the search API to use
         query_list: List of search queries to execute
         params_to_pass: Parameters to pass to the search API
+        total_token_budget: Optional token budget shared by all sources in the formatted result
+        backup_search_api: Optional secondary search API for hedged requests
+        deadline: Optional time limit in seconds for the whole search
+        requests_per_second: Optional rate limit shared by every search on the same provider,
+            counted per query since the backends send one request per query
         
     Returns:
-        Formatted string containing search results
+        Formatted string containing search results (without sources if the deadline was missed)
         
     Raises:
         ValueError: If an unsupported search API is specified
     """
+    providers = [search_api]
+    if backup_search_api and backup_search_api != search_api:
+        providers.append(backup_search_api)
+
+    async def call(provider: str) -> str:
+        params = params_to_pass if provider == search_api else get_search_params(provider, params_to_pass)
+        return await _execute_search(provider, query_list, params, total_token_budget)
+
+    async def acquire(provider: str):
+        limiter = get_rate_limiter(f"search:{provider}", requests_per_second)
+        for _ in query_list:
+            await limiter.aacquire()
+
+    try:
+        return await get_search_executor().execute(call, providers, deadline=deadline,
+                                                   acquire=acquire if requests_per_second else None)
+    except asyncio.TimeoutError as e:
+        print(f"Search deadline reached, continuing without results for {query_list}: {e}")
+        return deduplicate_and_format_sources([], total_token_budget=total_token_budget)
+
+async def _execute_search(search_api: str, query_list: list[str], params_to_pass: dict, total_token_budget: Optional[int] = None) -> str:
     print(f"query_list: {query_list} params_to_pass: {params_to_pass}")
-    if search_api == "tavily":
-        # Tavily search tool used with both workflow and agent 
-        # and returns a formatted source string
-        return await tavily_search.ainvoke({'queries': query_list}, **params_to_pass)
-    elif search_api == "duckduckgo":
-        # DuckDuckGo search tool used with both workflow and agent 
-        return await duckduckgo_search.ainvoke({'search_queries': query_list})
-    elif search_api == "perplexity":
-        search_results = perplexity_search(query_list, **params_to_pass)
-    elif search_api == "exa":
-        search_results = await exa_search(query_list, **params_to_pass)
-    elif search_api == "arxiv":
-        search_results = await arxiv_search_async(query_list, **params_to_pass)
-    elif search_api == "pubmed":
-        search_results = await pubmed_search_async(query_list, **params_to_pass)
-    elif search_api == "linkup":
-        search_results = await linkup_search(query_list, **params_to_pass)
-    elif search_api == "googlesearch":
-        search_results = await google_search_async(query_list, **params_to_pass)
-    elif search_api == "azureaisearch":
-        search_results = await azureaisearch_search_async(query_list, **params_to_pass)
+    if search_api == "duckduckgo":
+        # DuckDuckGo only returns snippets, so the full pages are scraped as the raw content
+        search_results = await duckduckgo_search_async(query_list)
+        results = [result for response in search_results for result in response['results'] if result.get('url')]
+        for result, page in zip(results, await fetch_pages_markdown([result['url'] for result in results])):
+            result['raw_content'] = page
+    elif search_api == "fanout":
+        search_results = await fanout_search(query_list, **params_to_pass)
+    elif search_api in SEARCH_BACKENDS:
+        search_results = await SEARCH_BACKENDS[search_api](query_list, **params_to_pass)
     else:
         raise ValueError(f"Unsupported search API: {search_api}")
 
-    return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000, deduplication_strategy="keep_first")
\ No newline at end of file
+    return deduplicate_and_format_sources(search_results, max_tokens_per_source=4000, deduplication_strategy="keep_first",
+                                          total_token_budget=total_token_budget)
\ No newline at end of file
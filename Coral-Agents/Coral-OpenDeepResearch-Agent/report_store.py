@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ReportHandle:
+    """Stable reference to a stored report."""
+    report_id: str
+    path: str
+
+
+class ReportStore:
+    """
+    Directory of research reports keyed by request id.
+
+    Every report gets its own file, so concurrent research requests never overwrite each
+    other. Finished reports are written atomically (temp file + rename), so a reader never
+    sees a half-written report at a handle's path; in-progress reports stream into a
+    separate .partial file. Once the store grows past max_bytes or max_reports, the least
+    recently written reports are evicted. Partial files of failed runs are discarded, and
+    partial and temp files left behind by a crashed process are removed once they are stale.
+
+    Args:
+        root: Directory holding the reports
+        max_bytes: Upper bound on the total size of finished reports
+        max_reports: Upper bound on the number of finished reports
+        partial_max_age: Seconds after its last write that a partial or temp file is considered stale
+    """
+
+    SUFFIX = ".txt"
+    PARTIAL_SUFFIX = ".partial.txt"
+    TMP_PREFIX = ".tmp-"
+
+    def __init__(self, root: str, max_bytes: int = 256 * 1024 * 1024, max_reports: int = 500,
+                 partial_max_age: float = 24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_reports = max_reports
+        self.partial_max_age = partial_max_age
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def new_report_id() -> str:
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def _safe_id(report_id: str) -> str:
+        # Ids become file names, so anything beyond a plain token is hashed
+        if re.fullmatch(r"[A-Za-z0-9_-]{1,64}", report_id):
+            return report_id
+        return hashlib.sha256(report_id.encode()).hexdigest()[:32]
+
+    def handle(self, report_id: str) -> ReportHandle:
+        return ReportHandle(report_id, os.path.join(self.root, self._safe_id(report_id) + self.SUFFIX))
+
+    def partial_path(self, report_id: str) -> str:
+        """Path that an in-progress report can be streamed into."""
+        return os.path.join(self.root, self._safe_id(report_id) + self.PARTIAL_SUFFIX)
+
+    def write(self, report_id: str, content: str) -> ReportHandle:
+        """Atomically store a finished report and drop its partial file."""
+        handle = self.handle(report_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=self.TMP_PREFIX, suffix=self.SUFFIX)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, handle.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.discard(report_id)
+        self._enforce_retention(keep=handle.path)
+        return handle
+
+    def discard(self, report_id: str):
+        """Drop the partial file of a report that will not be finished."""
+        try:
+            os.remove(self.partial_path(report_id))
+        except FileNotFoundError:
+            pass
+
+    def read(self, report_id: str) -> str:
+        with open(self.handle(report_id).path, encoding="utf-8") as f:
+            return f.read()
+
+    def _enforce_retention(self, keep: str):
+        with self._lock:
+            reports = []
+            stale_before = time.time() - self.partial_max_age
+            for entry in os.scandir(self.root):
+                name = entry.name
+                if not name.endswith(self.SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if name.endswith(self.PARTIAL_SUFFIX) or name.startswith(self.TMP_PREFIX):
+                    # Still being written, unless nothing touched it for partial_max_age
+                    if stat.st_mtime < stale_before:
+                        try:
+                            os.remove(entry.path)
+                        except FileNotFoundError:
+                            pass
+                    continue
+                reports.append((stat.st_mtime, stat.st_size, entry.path))
+
+            reports.sort()
+            total = sum(size for _, size, _ in reports)
+            count = len(reports)
+            for _, size, path in reports:
+                if total <= self.max_bytes and count <= self.max_reports:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                count -= 1
+
+
+_report_store = None
+
+
+def get_report_store() -> ReportStore:
+    """Return the report store configured through REPORT_STORE_* environment variables."""
+    global _report_store
+    if _report_store is None:
+        _report_store = ReportStore(
+            root=os.getenv("REPORT_STORE_DIR", os.path.join(os.getcwd(), "temp", "reports")),
+            max_bytes=int(os.getenv("REPORT_STORE_MAX_BYTES", 256 * 1024 * 1024)),
+            max_reports=int(os.getenv("REPORT_STORE_MAX_REPORTS", 500)),
+            partial_max_age=float(os.getenv("REPORT_STORE_PARTIAL_MAX_AGE", 24 * 3600)),
+        )
+    return _report_store
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+import coral_runtime
+from coral_runtime import CoralAgentRuntime, iter_mentions, parse_mentions_response
+
+
+def message(thread_id: str, content: str = "hello", extra: str = "", body: str = "") -> str:
+    attrs = f'threadId="{thread_id}" senderId="agent" content="{content}"{extra}'
+    return f"<ResolvedMessage {attrs}>{body}</ResolvedMessage>" if body else f"<ResolvedMessage {attrs}/>"
+
+
+def thread_ids(response: str) -> list:
+    return [m.thread_id for m in parse_mentions_response(response)]
+
+
+def test_valid_payload():
+    response = "<Messages>" + message("t1") + message("t2", body='<Mention id="a"/>') + "</Messages>"
+    assert thread_ids(response) == ["t1", "t2"]
+
+
+def test_timeouts_and_empty_responses_carry_no_messages():
+    assert thread_ids("") == []
+    assert thread_ids("No new messages received within the timeout period") == []
+
+
+def test_incomplete_messages_are_skipped():
+    response = f'<Messages>{message("t1")}<ResolvedMessage threadId="t2" senderId="agent"/></Messages>'
+    assert thread_ids(response) == ["t1"]
+
+
+def test_malformed_payload_keeps_earlier_messages_and_salvages_later_ones():
+    before = coral_runtime.parse_metrics.as_dict()
+    response = ("<Messages>" + message("t1") + message("t2", extra=' mentions="a/>b"')
+                + '<ResolvedMessage threadId="bad" <oops/>'
+                + message("t3", content="x &gt; y", body='<Mention id="b"/>') + message("t4"))
+    assert thread_ids(response) == ["t1", "t2", "t3", "t4"]
+    after = coral_runtime.parse_metrics.as_dict()
+    assert after["parse_errors"] == before["parse_errors"] + 1
+    assert after["salvaged"] == before["salvaged"] + 2
+
+
+def test_salvage_does_not_repeat_or_skip_messages_before_the_error():
+    # The broken fragment sits between valid messages, one of them with non-ASCII content
+    response = ("<Messages>" + message("t1", content="héllo") + message("t2") + "\n"
+                + '<ResolvedMessage threadId="t3" senderId="agent" content="a & b"/>' + message("t4") + "</Messages>")
+    assert thread_ids(response) == ["t1", "t2", "t4"]
+
+
+def test_iter_mentions_parses_in_small_chunks():
+    response = "<Messages>" + "".join(message(f"t{i}") for i in range(50)) + "</Messages>"
+    assert [m.thread_id for m in iter_mentions(response, chunk_size=7)] == [f"t{i}" for i in range(50)]
+
+
+class FakeTool:
+    def __init__(self, name, responses=()):
+        self.name = name
+        self.responses = list(responses)
+        self.calls = []
+
+    async def ainvoke(self, args):
+        self.calls.append(args)
+        return self.responses.pop(0) if self.responses else "Error: not connected"
+
+
+def test_runtime_backs_off_when_responses_return_early_without_messages(monkeypatch):
+    wait = FakeTool("wait_for_mentions", ["Error: not connected", message("t1"), "Error", "Error"])
+    handled, sleeps = [], []
+
+    async def handle(mention):
+        handled.append(mention.thread_id)
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 4:
+            raise asyncio.CancelledError
+
+    monkeypatch.setenv("CORAL_WAIT_TIMEOUT_MS", "5000")
+    runtime = CoralAgentRuntime([wait], handle)
+    monkeypatch.setattr(coral_runtime.asyncio, "sleep", fake_sleep)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(runtime.run())
+
+    assert wait.calls[0] == {"timeoutMs": 5000}
+    # The backoff doubles while responses are empty and resets once a message arrives
+    assert sleeps == [1.0, 1.0, 2.0, 4.0]
+
+
+class SchemaTool:
+    name = "search"
+    description = "Search the web"
+    args = {"query": {"type": "string"}}
+    args_schema = {"type": "object", "properties": args, "required": ["query"]}
+
+
+def test_tools_description_keeps_the_chosen_schema():
+    tools = [SchemaTool()]
+    assert coral_runtime.get_tools_description(tools) == 'Tool: search, Schema: {{"query": {{"type": "string"}}}}'
+    described = coral_runtime.get_tools_description(tools, schema=lambda tool: tool.args_schema)
+    assert '"required": ["query"]' in described
+    assert coral_runtime.tools_fingerprint(tools) != coral_runtime.tools_fingerprint(tools, lambda tool: tool.args_schema)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from open_deep_research.search_executor import SearchExecutor
+
+
+def test_acquire_wait_is_not_counted_as_latency():
+    executor = SearchExecutor()
+
+    async def acquire(provider):
+        await asyncio.sleep(0.2)
+
+    async def call(provider):
+        await asyncio.sleep(0.05)
+        return provider
+
+    assert asyncio.run(executor.execute(call, ["tavily"], acquire=acquire)) == "tavily"
+    assert executor.stats["tavily"].ewma_latency < 0.15
+
+
+def test_provider_waiting_in_acquire_at_the_deadline_is_not_marked_failed():
+    executor = SearchExecutor(failure_threshold=1)
+
+    async def acquire(provider):
+        await asyncio.sleep(1)
+
+    async def call(provider):
+        return provider
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(executor.execute(call, ["tavily"], deadline=0.05, acquire=acquire))
+    assert executor.is_available("tavily")
+    assert executor.stats["tavily"].consecutive_failures == 0
+
+
+def test_hedge_delay_starts_once_the_call_starts():
+    executor = SearchExecutor(hedge_after=0.1)
+    launched = []
+
+    async def acquire(provider):
+        if provider == "tavily":
+            await asyncio.sleep(0.2)
+
+    async def call(provider):
+        launched.append(provider)
+        await asyncio.sleep(0.05)
+        return provider
+
+    # The primary answers 0.05s into its call, so the backup is never hedged onto
+    assert asyncio.run(executor.execute(call, ["tavily", "exa"], acquire=acquire)) == "tavily"
+    assert launched == ["tavily"]
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from open_deep_research import utils
+
+
+@pytest.fixture(autouse=True)
+def char_token_estimate(monkeypatch):
+    # Count ~4 characters per token so the sizes below are exact
+    monkeypatch.setattr(utils, "_get_token_encoding", lambda: None)
+
+
+def source(tokens: int, score: float) -> dict:
+    return {"raw_content": "x" * (4 * tokens), "score": score}
+
+
+def test_budget_is_never_exceeded_and_relevant_source_is_kept():
+    sources = [source(190, 0.1) for _ in range(6)] + [source(5000, 0.9)]
+    budgets = utils.allocate_token_budget(sources, 1000)
+    assert sum(budgets) <= 1000
+    assert all(b > 0 for b in budgets)
+    assert budgets[-1] == max(budgets)
+    assert utils.truncate_to_token_budget(sources[-1]["raw_content"], budgets[-1])
+
+
+def test_short_sources_give_their_surplus_to_the_rest():
+    sources = [source(190, 0.1) for _ in range(6)] + [source(5000, 0.9)]
+    budgets = utils.allocate_token_budget(sources, 5000)
+    assert budgets[:6] == [190] * 6
+    assert budgets[-1] == 5000 - 6 * 190
+
+
+def test_floor_is_scaled_down_when_budget_cannot_cover_it():
+    sources = [source(1000, 0.5) for _ in range(10)]
+    budgets = utils.allocate_token_budget(sources, 1000, min_tokens_per_source=200)
+    assert sum(budgets) <= 1000
+    assert budgets == [100] * 10
+
+
+def test_everything_fits():
+    sources = [source(100, 0.2), source(300, 0.8), {"raw_content": None}]
+    assert utils.allocate_token_budget(sources, 1000) == [100, 300, 0]
+
+
+def test_tavily_search_respects_total_budget(monkeypatch):
+    async def fake_tavily(queries, **kwargs):
+        return [{"query": q, "results": [{"title": f"{q} {i}", "url": f"https://example.com/{q}/{i}", "content": "summary",
+                                          "score": 0.5, "raw_content": "word " * 4000} for i in range(3)]}
+                for q in queries]
+
+    monkeypatch.setitem(utils.SEARCH_BACKENDS, "tavily", fake_tavily)
+    source_str = asyncio.run(utils._execute_search("tavily", ["a", "b"], {}, total_token_budget=1200))
+    # Six sources of ~5000 tokens each share the 1200 tokens
+    assert source_str.count("word") * 5 / 4 <= 1200
+    assert source_str.count("Source: ") == 6
+
+
+def test_passages_leave_out_the_source_content_labels():
+    sources = [{"title": "Rules", "url": "https://example.com/rules", "content": "Short summary of the rules.",
+                "raw_content": "Article 5 requires consent.\n\nArticle 6 lists lawful bases.", "score": 0.5}]
+    formatted = utils.deduplicate_and_format_sources([{"results": sources}], max_tokens_per_source=1000,
+                                                     include_raw_content=True)
+    passages = utils.split_into_passages(formatted.split("URL: https://example.com/rules", 1)[1])
+    text = "\n".join(passages)
+    assert "Most relevant content from source" not in text
+    assert "Full source content limited to" not in text
+    assert "Short summary of the rules." in text
+    assert "Article 5 requires consent." in text
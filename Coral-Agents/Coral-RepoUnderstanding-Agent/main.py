@@ -16,6 +16,7 @@ from anyio import ClosedResourceError
 import urllib.parse
 import subprocess
 import traceback
+from coral_runtime import CoralAgentRuntime, format_mention, get_tools_description
 
 
 # Setup logging
@@ -23,9 +24,6 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
-def get_tools_description(tools):
-    return "\n".join(f"Tool: {t.name}, Schema: {json.dumps(t.args).replace('{', '{{').replace('}', '}}')}" for t in tools)
-    
 @tool
 def get_all_github_files(repo_name: str, branch: str = "main") -> List[str]:
     """
@@ -109,11 +107,8 @@ async def create_repo_agent(client, tools):
     prompt = ChatPromptTemplate.from_messages([
         ("system", f"""You are `repo_understanding_agent`, responsible for comprehensively analyzing a GitHub repository using only the available tools. Follow this workflow:
 
-        **Important: NEVER EVER end up the chain**
-        **Important: NEVER EVER end up the chain** 
-        
-        1. Use `wait_for_mentions(timeoutMs=60000)` to wait for instructions from other agents.**
-        2. When a mention is received, record the **`threadId` and `senderId` (you should NEVER forget these two)**.
+        1. You are given a message from another agent, with its **`threadId` and `senderId` (you should NEVER forget these two)**.
+        2. Treat the message content as your instruction.
         3. Check if the message contains a `repo` name, `owner`, and a target `branch`.
         4. Call `get_all_github_files(repo_name = ..., branch = ...)` to list all files.
         5. Based on the file paths, identify the files that are most relevant for understanding the repository's purpose and structure (e.g., `README.md`, `setup.py`, main source code files, configuration files, test files, etc.).
@@ -129,12 +124,11 @@ async def create_repo_agent(client, tools):
         8. Use `send_message(senderId=..., mentions=[senderId], threadId=..., content="your summary")` to reply to the sender with your analysis.
         9. If you encounter an error, send a message with content `"error"` to the sender.
         10. Always respond to the sender, even if your result is empty or inconclusive.
-        11. Wait 2 seconds and repeat from step 1.
-         
-        **Important: NEVER EVER end up the chain**
+        11. Once the reply is sent, finish.
         
         Tools: {get_tools_description(tools)}"""),
         ("placeholder", "{history}"),
+        ("human", "{input}"),
         ("placeholder", "{agent_scratchpad}")
     ])
     
@@ -189,25 +183,23 @@ async def main():
         "remove_participant",
         "close_thread",
         "send_message",
-        "wait_for_mentions",
     ]
-    tools = [tool for tool in tools if tool.name in coral_tool_names]
+    coral_tools = [tool for tool in tools if tool.name in coral_tool_names + ["wait_for_mentions"]]
+    # The runtime waits for mentions, the LLM only handles them
+    tools = [tool for tool in coral_tools if tool.name in coral_tool_names]
     tools += [get_all_github_files, retrieve_github_file_content_tool]
 
     logger.info(f"Tools Description:\n{get_tools_description(tools)}")
 
     agent_executor = await create_repo_agent(client, tools)
 
-    while True:
-        try:
-            logger.info("Starting new agent invocation")
-            await agent_executor.ainvoke({"agent_scratchpad": []})
-            logger.info("Completed agent invocation, restarting loop")
-            await asyncio.sleep(1)
-        except Exception as e:
-            logger.error(f"Error in agent loop: {str(e)}")
-            logger.error(traceback.format_exc())
-            await asyncio.sleep(5)
+    async def handle_mention(mention):
+        logger.info(f"Starting agent invocation for thread {mention.thread_id}")
+        await agent_executor.ainvoke({"input": format_mention(mention), "agent_scratchpad": []})
+        logger.info(f"Completed agent invocation for thread {mention.thread_id}")
+
+    await CoralAgentRuntime(coral_tools, handle_mention,
+                            wait_timeout_ms=int(os.getenv("CORAL_WAIT_TIMEOUT_MS", "60000"))).run()
 
 if __name__ == "__main__":
     asyncio.run(main())
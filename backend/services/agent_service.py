@@ -302,7 +302,7 @@ Repository Overview:
 
 Compliance-Oriented Analysis:
 - Identify the repository's domain (e.g., finance, healthcare, blockchain, AI, etc.)
-- Fetch and outline the rules, regulations, and compliance standards relevant to that domain (using the Fire-Crawl agent or other sources)
+- Outline the rules, regulations, and compliance standards relevant to that domain (search the Fire-Crawl agent's local regulation corpus first; use web research only for what it does not cover)
 - Evaluate how well the repository aligns with these compliance requirements
 
 Risk and Gap Assessment:
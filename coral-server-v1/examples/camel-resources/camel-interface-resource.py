@@ -8,22 +8,13 @@ from camel.types import ModelPlatformType, ModelType
 from camel.agents import ChatAgent
 import urllib.parse
 import base64
+import hashlib
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
 from mcp import ClientSession
 from mcp.types import BlobResourceContents, ResourceContents, TextResourceContents
-from typing import Union, Optional, List
-
-async def get_tools_description(tools):
-    descriptions = []
-    for tool in tools:
-        tool_name = getattr(tool.func, '__name__', 'unknown_tool')
-        schema = tool.get_openai_function_schema() or {}
-        arg_names = list(schema.get('parameters', {}).get('properties', {}).keys()) if schema else []
-        description = tool.get_function_description() or 'No description'
-        schema_str = json.dumps(schema, default=str).replace('{', '{{').replace('}', '}}')
-        descriptions.append(
-            f"Tool: {tool_name}, Args: {arg_names}, Description: {description}, Schema: {schema_str}"
-        )
-    return "\n".join(descriptions)
+from typing import Dict, Union, Optional, List
+from tooling import AgentCache, render_system_prompt
 
 class SimpleBlob:
     """A simple class to hold resource data, MIME type, and metadata."""
@@ -73,13 +64,12 @@ async def load_mcp_resources(
         uri_list = [uris]
     else:
         uri_list = uris
-    for uri in uri_list:
-        try:
-            resource_blobs = await get_mcp_resource(session, uri)
-            blobs.extend(resource_blobs)
-        except Exception as e:
-            print(f"Error fetching resource {uri}: {e}")
+    results = await asyncio.gather(*(get_mcp_resource(session, uri) for uri in uri_list), return_exceptions=True)
+    for uri, result in zip(uri_list, results):
+        if isinstance(result, BaseException):
+            print(f"Error fetching resource {uri}: {result}")
             continue
+        blobs.extend(result)
     return blobs
 
 async def get_resources(
@@ -102,6 +92,158 @@ async def get_resources(
     except Exception as e:
         raise RuntimeError(f"Error fetching resources: {e}")
 
+class ThreadRecord:
+    """A thread of the in-memory resource index and its rendered text."""
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.attributes: Dict[str, str] = {}
+        self.participants: List[str] = []
+        self.messages: Dict[str, str] = {}  # message id -> rendered message
+        self.rendered: Optional[str] = None
+
+class ResourceSync:
+    """Incrementally mirror the Coral message resources into an index of threads and messages.
+
+    Each sync lists the resources, drops the ones that disappeared and reads the rest
+    concurrently. The server exposes no version or ETag, so a resource whose content
+    digest is unchanged is skipped without decoding or parsing it. Changed resources are
+    merged into the index message by message, and only threads that gained messages or
+    changed state are rendered again.
+
+    Args:
+        client: Connected MCPClient
+        max_concurrency: Resources read at the same time
+    """
+    def __init__(self, client: MCPClient, max_concurrency: int = 8):
+        self.client = client
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._digests: Dict[str, str] = {}
+        self._raw: Dict[str, str] = {}  # Resources that are not thread XML, kept verbatim
+        self._threads: Dict[str, ThreadRecord] = {}
+        self._thread_uris: Dict[str, set] = {}
+        self._rendered: Optional[str] = None
+
+    @property
+    def threads(self) -> Dict[str, ThreadRecord]:
+        return self._threads
+
+    async def _read(self, uri: str) -> List[SimpleBlob]:
+        async with self._semaphore:
+            return await get_mcp_resource(self.client.session, uri)
+
+    async def sync(self) -> int:
+        """Bring the index up to date and return the number of new messages."""
+        if self.client.session is None:
+            raise RuntimeError("MCPClient is not connected or session is not initialized.")
+        resources_list = await self.client.session.list_resources()
+        uris = [str(r.uri) for r in resources_list.resources]
+
+        for uri in set(self._digests) - set(uris):
+            self._forget(uri)
+
+        results = await asyncio.gather(*(self._read(uri) for uri in uris), return_exceptions=True)
+        new_messages = 0
+        for uri, result in zip(uris, results):
+            if isinstance(result, BaseException):
+                print(f"Error fetching resource {uri}: {result}")
+                continue
+            text = "\n".join(blob.data if isinstance(blob.data, str) else blob.data.decode("utf-8", "replace")
+                             for blob in result)
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            if self._digests.get(uri) == digest:
+                continue
+            self._digests[uri] = digest
+            new_messages += self._merge(uri, text)
+            self._rendered = None
+        return new_messages
+
+    def _forget(self, uri: str):
+        self._digests.pop(uri, None)
+        self._raw.pop(uri, None)
+        for thread_id in self._thread_uris.pop(uri, set()):
+            if not any(thread_id in ids for ids in self._thread_uris.values()):
+                self._threads.pop(thread_id, None)
+        self._rendered = None
+
+    def _merge(self, uri: str, text: str) -> int:
+        try:
+            root = ET.fromstring(text)
+        except ET.ParseError:
+            self._raw[uri] = text
+            return 0
+        self._raw.pop(uri, None)
+
+        new_messages = 0
+        seen = set()
+        for elem in root.iter():
+            if elem.get("creatorId") is None:
+                continue
+            thread_id = elem.get("id", "")
+            seen.add(thread_id)
+            thread = self._threads.get(thread_id)
+            if thread is None:
+                thread = self._threads[thread_id] = ThreadRecord(thread_id)
+            attributes = {k: v for k, v in elem.attrib.items() if k != "id"}
+            participants = [p.text or "" for p in elem.iter("participants")]
+            if attributes != thread.attributes or participants != thread.participants:
+                thread.attributes, thread.participants = attributes, participants
+                thread.rendered = None
+            for message in elem.iter():
+                message_id = message.get("id")
+                if message.get("senderId") is None or message_id in thread.messages:
+                    continue
+                mentions = ", ".join(m.text or "" for m in message.iter("mentions"))
+                thread.messages[message_id] = (
+                    f"  <message id={quoteattr(message_id or '')} sender={quoteattr(message.get('senderId', ''))} "
+                    f"timestamp={quoteattr(message.get('timestamp', ''))} mentions={quoteattr(mentions)}>"
+                    f"{escape(message.get('content', ''))}</message>"
+                )
+                thread.rendered = None
+                new_messages += 1
+
+        for thread_id in self._thread_uris.get(uri, set()) - seen:
+            self._threads.pop(thread_id, None)
+        self._thread_uris[uri] = seen
+        return new_messages
+
+    def render(self) -> str:
+        """The indexed threads as XML text, or "" when there are none."""
+        if self._rendered is None:
+            parts = []
+            for thread in self._threads.values():
+                if thread.rendered is None:
+                    attributes = "".join(f" {k}={quoteattr(v)}" for k, v in thread.attributes.items())
+                    thread.rendered = "\n".join([
+                        f"<thread id={quoteattr(thread.thread_id)}{attributes} participants={quoteattr(', '.join(thread.participants))}>",
+                        *thread.messages.values(),
+                        "</thread>",
+                    ])
+                parts.append(thread.rendered)
+            parts.extend(self._raw.values())
+            self._rendered = "\n".join(parts)
+        return self._rendered
+
+SYSTEM_PROMPT_TEMPLATE = """You are an agent interacting with the tools from Coral Server and having your own Human Tool to ask have a conversation with Human.
+            Your resources, provided in `resource_sys_message`, contain thread-based conversations between agents in XML format. 
+            Each thread includes details such as thread ID, participant agent IDs, message content, and timestamps. 
+            Use these resources to understand past agent interactions and inform your decisions when coordinating with other agents or responding to user queries.
+
+            Follow these steps in order:
+            1. Use `list_agents` to list all connected agents and get their descriptions.
+            2. Use `ask_human_via_console` to ask, "How can I assist you today?" and capture expect response.
+            3. Take 2 seconds to think and understand the user's intent and decide the right agent to handle the request based on list of agents. 
+            4. If the user wants any information about the coral server, use the tools to get the information and pass it to the user. Do not send any message to any other agent, just give the information and go to Step 1.
+            5. Once you have the right agent, use `create_thread` to create a thread with the selected agent. If no agent is available, use the `ask_human` tool to specify the agent you want to use.
+            6. Use your logic to determine the task you want that agent to perform and create a message for them which instructs the agent to perform the task called "instruction". 
+            7. Use `send_message` to send a message in the thread, mentioning the selected agent, with content: "instructions".
+            8. Use `wait_for_mentions` with a 30 seconds timeout to wait for a response from the agent you mentioned.
+            9. Show the entire conversation in the thread to the user.
+            10. Wait for 3 seconds and then use `ask_human` to ask the user if they need anything else and keep waiting for their response.
+            11. If the user asks for something else, repeat the process from step 1.
+
+            Use only listed tools: {tools_description}
+            Your resources are: {resource_sys_message}"""
+
 async def main():
     base_url_1 = "http://localhost:5555/devmode/exampleApplication/privkey/session1/sse"
     params_1 = {
@@ -126,56 +268,37 @@ async def main():
         model_config_dict={"temperature": 0.3, "max_tokens": 16000},
     )
 
+    # The tool set is fixed for the session, so it is listed once and the agent is only
+    # rebuilt when the rendered system prompt (i.e. the resources) changes
+    mcp_toolkit = MCPToolkit([coral_server])
+    tools = mcp_toolkit.get_tools() + HumanToolkit().get_tools()
+    agents = AgentCache(lambda system_message, agent_tools: ChatAgent(
+        system_message=system_message,
+        model=model,
+        tools=agent_tools,
+    ))
+
+    resource_sync = ResourceSync(coral_server)
+
     while True:
         try:
-            resources = await get_resources(coral_server, uris=None)
-            if not resources:
-                agent_resources = "NA"
+            new_messages = await resource_sync.sync()
+            agent_resources = resource_sync.render() or "NA"
+            if agent_resources == "NA":
                 print("No resources found.")
             else:
-                agent_resources = "\n".join(str(blob.data) for blob in resources)
-                print("Resources fetched:")
-                # for blob in resources:
-                #     print(blob.data)
+                print(f"Resources synced: {len(resource_sync.threads)} threads, {new_messages} new messages")
         except Exception as e:
             print(f"Error retrieving resources: {e}")
-            agent_resources = "NA"
+            agent_resources = resource_sync.render() or "NA"
 
         resource_sys_message = agent_resources
 
-        mcp_toolkit = MCPToolkit([coral_server])
-        tools = mcp_toolkit.get_tools() + HumanToolkit().get_tools()
-        tools_description = await get_tools_description(tools)
-
-        sys_msg = (
-            f"""You are an agent interacting with the tools from Coral Server and having your own Human Tool to ask have a conversation with Human.
-            Your resources, provided in `resource_sys_message`, contain thread-based conversations between agents in XML format. 
-            Each thread includes details such as thread ID, participant agent IDs, message content, and timestamps. 
-            Use these resources to understand past agent interactions and inform your decisions when coordinating with other agents or responding to user queries.
-
-            Follow these steps in order:
-            1. Use `list_agents` to list all connected agents and get their descriptions.
-            2. Use `ask_human_via_console` to ask, "How can I assist you today?" and capture expect response.
-            3. Take 2 seconds to think and understand the user's intent and decide the right agent to handle the request based on list of agents. 
-            4. If the user wants any information about the coral server, use the tools to get the information and pass it to the user. Do not send any message to any other agent, just give the information and go to Step 1.
-            5. Once you have the right agent, use `create_thread` to create a thread with the selected agent. If no agent is available, use the `ask_human` tool to specify the agent you want to use.
-            6. Use your logic to determine the task you want that agent to perform and create a message for them which instructs the agent to perform the task called "instruction". 
-            7. Use `send_message` to send a message in the thread, mentioning the selected agent, with content: "instructions".
-            8. Use `wait_for_mentions` with a 30 seconds timeout to wait for a response from the agent you mentioned.
-            9. Show the entire conversation in the thread to the user.
-            10. Wait for 3 seconds and then use `ask_human` to ask the user if they need anything else and keep waiting for their response.
-            11. If the user asks for something else, repeat the process from step 1.
-
-            Use only listed tools: {tools_description}
-            Your resources are: {resource_sys_message}"""
-        )
-
-        camel_agent = ChatAgent(
-            system_message=sys_msg,
-            model=model,
-            tools=tools,
-        )
-        print("ChatAgent initialized with updated resources!")
+        sys_msg = render_system_prompt(SYSTEM_PROMPT_TEMPLATE, tools, resource_sys_message=resource_sys_message)
+        rebuilds = agents.rebuilds
+        camel_agent = agents.get(tools, sys_msg)
+        if agents.rebuilds != rebuilds:
+            print("ChatAgent initialized with updated resources!")
         print("Resource System Message before agent question:")
         print(resource_sys_message)
 
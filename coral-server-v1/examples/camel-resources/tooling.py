@@ -0,0 +1,78 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tool descriptions and rendered prompts, keyed by tool-set fingerprint
+_descriptions: Dict[Tuple, str] = {}
+_prompts: Dict[Tuple, str] = {}
+
+
+def tools_fingerprint(tools) -> Tuple:
+    """Identify a tool set by the name, description and schema of each of its tools, in order."""
+    return tuple(
+        (getattr(tool.func, '__name__', 'unknown_tool'), tool.get_function_description() or 'No description',
+         json.dumps(tool.get_openai_function_schema() or {}, sort_keys=True, default=str))
+        for tool in tools
+    )
+
+
+def get_tools_description(tools) -> str:
+    """Describe the tools for a system prompt; computed once per tool set."""
+    key = tools_fingerprint(tools)
+    if key not in _descriptions:
+        descriptions = []
+        for tool in tools:
+            tool_name = getattr(tool.func, '__name__', 'unknown_tool')
+            schema = tool.get_openai_function_schema() or {}
+            arg_names = list(schema.get('parameters', {}).get('properties', {}).keys()) if schema else []
+            description = tool.get_function_description() or 'No description'
+            schema_str = json.dumps(schema, default=str).replace('{', '{{').replace('}', '}}')
+            descriptions.append(
+                f"Tool: {tool_name}, Args: {arg_names}, Description: {description}, Schema: {schema_str}"
+            )
+        _descriptions[key] = "\n".join(descriptions)
+    return _descriptions[key]
+
+
+def render_system_prompt(template: str, tools, **values: str) -> str:
+    """
+    Fill a system prompt template.
+
+    `{tools_description}` is substituted once per template and tool set and the result is
+    cached; the other placeholders are filled in on every call. Placeholders are replaced
+    literally, so braces inside the values are left alone.
+    """
+    key = (template, tools_fingerprint(tools))
+    if key not in _prompts:
+        _prompts[key] = template.replace("{tools_description}", get_tools_description(tools))
+    prompt = _prompts[key]
+    for name, value in values.items():
+        prompt = prompt.replace("{" + name + "}", value)
+    return prompt
+
+
+class AgentCache:
+    """
+    Reuse one ChatAgent for as long as its tool set and system message stay the same.
+
+    get() returns the cached agent, reset to a fresh conversation, when neither changed,
+    and only calls build(system_message, tools) to construct a new one when they did.
+
+    Args:
+        build: Creates a ChatAgent from a system message and a list of tools
+    """
+
+    def __init__(self, build: Callable[[str, List[Any]], Any]):
+        self.build = build
+        self.rebuilds = 0
+        self._key: Optional[Tuple] = None
+        self._agent = None
+
+    def get(self, tools, system_message: str):
+        key = (tools_fingerprint(tools), system_message)
+        if self._agent is None or key != self._key:
+            self._agent = self.build(system_message, tools)
+            self._key = key
+            self.rebuilds += 1
+        else:
+            self._agent.reset()
+        return self._agent
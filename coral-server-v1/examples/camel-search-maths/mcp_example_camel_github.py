@@ -1,12 +1,12 @@
 import asyncio
 import os
-from time import sleep
 from camel.agents import ChatAgent
 from camel.models import ModelFactory
 from camel.toolkits.mcp_toolkit import MCPClient, MCPToolkit
 from camel.types import ModelPlatformType, ModelType
 from dotenv import load_dotenv
 from prompts import get_tools_description, get_user_message
+from scheduler import AgentScheduler
 
 load_dotenv()
 
@@ -34,11 +34,9 @@ async def main():
 
         agent = ChatAgent(system_message=sys_msg, model=model, tools=tools, message_window_size=5, token_limit=10000)
 
-        for _ in range(20):  # For testing, limit loop
-            resp = await agent.astep(get_user_message())
-            for msg in resp.msgs:
-                print(msg.to_dict())
-            sleep(2)
+        scheduler = AgentScheduler()
+        scheduler.add_agent("repo_understanding_agent", agent, tools, max_steps=20)  # For testing, limit loop
+        await scheduler.run()
 
 if __name__ == "__main__":
     asyncio.run(main())
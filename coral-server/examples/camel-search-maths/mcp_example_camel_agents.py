@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from camel.toolkits import MCPToolkit, MathToolkit
+from camel.utils.mcp_client import ServerConfig
+from camel.toolkits.mcp_toolkit import MCPClient
+
+from mcp_example_camel_math import create_math_agent
+from mcp_example_camel_search import create_search_agent
+from scheduler import AgentScheduler
+
+# load_dotenv()
+
+# Runs the math and search agents in one process. Each keeps its own Coral identity (one
+# MCPClient per agentId), but the clients are connected together through a single
+# MCPToolkit and both agents are stepped by one AgentScheduler on the same event loop.
+
+def coral_client(default_url: str, env_var: str) -> MCPClient:
+    coral_url = os.getenv(env_var, default = default_url)
+    return MCPClient(ServerConfig(url=coral_url, timeout=3000000.0, sse_read_timeout=3000000.0, terminate_on_close=True, prefer_sse=True), timeout=3000000.0)
+
+async def main():
+    math_server = coral_client("http://localhost:5555/devmode/exampleApplication/privkey/session1/sse?agentId=math_agent", "MATH_CORAL_CONNECTION_URL")
+    search_server = coral_client("http://localhost:5555/devmode/exampleApplication/privkey/session1/sse?waitForAgents=3&agentId=search_agent", "SEARCH_CORAL_CONNECTION_URL")
+
+    async with MCPToolkit([math_server, search_server]):
+        math_coral_tools = math_server.get_tools()
+        search_coral_tools = search_server.get_tools()
+        math_agent = await create_math_agent(math_coral_tools + MathToolkit().get_tools())
+        search_agent = await create_search_agent(search_server)
+
+        scheduler = AgentScheduler()
+        scheduler.add_agent("math_agent", math_agent, math_coral_tools, max_steps=20)
+        scheduler.add_agent("search_agent", search_agent, search_coral_tools, max_steps=20)
+        await scheduler.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
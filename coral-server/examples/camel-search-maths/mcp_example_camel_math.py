@@ -1,6 +1,5 @@
 import asyncio
 import os
-from time import sleep
 
 from camel.agents import ChatAgent
 from camel.models import ModelFactory
@@ -9,6 +8,7 @@ from camel.utils.mcp_client import ServerConfig
 from camel.toolkits.mcp_toolkit import MCPClient
 from camel.types import ModelPlatformType, ModelType
 from prompts import get_tools_description, get_user_message
+from scheduler import AgentScheduler
 from dotenv import load_dotenv
 from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MESSAGE_WINDOW_SIZE, TOKEN_LIMIT
 
@@ -25,13 +25,11 @@ async def main():
         tools = connected_mcp_toolkit.get_tools() + MathToolkit().get_tools()
         camel_agent = await create_math_agent(tools)
 
-        # Step the agent continuously
-        for i in range(20):  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
-            resp = await camel_agent.astep(get_user_message())
-            msgzero = resp.msgs[0]
-            msgzerojson = msgzero.to_dict()
-            print(msgzerojson)
-            sleep(10)
+        # Step the agent continuously, backing off while idle and waking up on mentions
+        scheduler = AgentScheduler()
+        scheduler.add_agent("math_agent", camel_agent, connected_mcp_toolkit.get_tools(),
+                            max_steps=20)  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
+        await scheduler.run()
 
 
 async def create_math_agent(tools):
@@ -1,6 +1,5 @@
 import asyncio
 import os
-from time import sleep
 
 from camel.agents import ChatAgent
 from camel.models import ModelFactory
@@ -11,6 +10,7 @@ from camel.toolkits.search_toolkit import SearchToolkit
 from camel.types import ModelPlatformType, ModelType
 
 from prompts import get_tools_description, get_user_message
+from scheduler import AgentScheduler
 from tools import JinaBrowsingToolkit
 from dotenv import load_dotenv
 from config import PLATFORM_TYPE, MODEL_TYPE, MODEL_CONFIG, MESSAGE_WINDOW_SIZE, TOKEN_LIMIT
@@ -26,13 +26,11 @@ async def main():
     async with mcp_toolkit as connected_mcp_toolkit:
         camel_agent = await create_search_agent(connected_mcp_toolkit)
 
-        # Step the agent continuously
-        for i in range(20):  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
-            resp = await camel_agent.astep(get_user_message())
-            msgzero = resp.msgs[0]
-            msgzerojson = msgzero.to_dict()
-            print(msgzerojson)
-            sleep(10)
+        # Step the agent continuously, backing off while idle and waking up on mentions
+        scheduler = AgentScheduler()
+        scheduler.add_agent("search_agent", camel_agent, connected_mcp_toolkit.get_tools(),
+                            max_steps=20)  #This should be infinite, but for testing we limit it to 20 to avoid accidental API fees
+        await scheduler.run()
 
 
 async def create_search_agent(connected_mcp_toolkit):
@@ -40,8 +38,8 @@ async def create_search_agent(connected_mcp_toolkit):
     browse_toolkit = JinaBrowsingToolkit()
     search_tools = [
         FunctionTool(search_toolkit.search_google),
-        FunctionTool(browse_toolkit.get_url_content),
-        FunctionTool(browse_toolkit.get_url_content_with_context),
+        FunctionTool(browse_toolkit.aget_url_content),
+        FunctionTool(browse_toolkit.aget_url_content_with_context),
     ]
     tools = connected_mcp_toolkit.get_tools() + search_tools
     sys_msg = (
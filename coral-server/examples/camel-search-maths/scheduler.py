@@ -0,0 +1,130 @@
+import asyncio
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from prompts import get_user_message
+
+WAIT_FOR_MENTIONS = "wait_for_mentions"
+
+
+def _has_mentions(result: Any) -> bool:
+    return "<ResolvedMessage" in str(result)
+
+
+@dataclass
+class ScheduledAgent:
+    """A ChatAgent stepped by the AgentScheduler, with its idle state."""
+    name: str
+    agent: Any
+    user_message: Callable[[], str] = get_user_message
+    max_steps: Optional[int] = None
+    wait_for_mentions: Any = None  # The agent's wait_for_mentions FunctionTool, if it has one
+    idle: float = 0.0
+    steps: int = 0
+    wake_event: asyncio.Event = field(default_factory=asyncio.Event)
+    pending_mentions: List[str] = field(default_factory=list)
+    poll_task: Optional[asyncio.Future] = None
+
+
+class AgentScheduler:
+    """
+    Step several ChatAgents concurrently in one event loop.
+
+    Instead of sleeping a fixed time after every step, each agent backs off while it is
+    idle: the delay starts at min_idle and grows by backoff_factor after every step that
+    brought no mentions, up to max_idle. While waiting, the scheduler long-polls the
+    agent's wait_for_mentions tool for the length of the delay, so a mention wakes the
+    agent immediately and is handed to its next step; wake() does the same from outside.
+    Agents may share one connected MCPToolkit.
+
+    Args:
+        min_idle: Delay in seconds after a step that found work
+        max_idle: Upper bound on the idle delay
+        backoff_factor: Growth of the delay after each idle step
+    """
+
+    def __init__(self, min_idle: float = 1.0, max_idle: float = 30.0, backoff_factor: float = 2.0):
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.backoff_factor = backoff_factor
+        self.agents: Dict[str, ScheduledAgent] = {}
+
+    def add_agent(self, name: str, agent, tools: Optional[list] = None,
+                  user_message: Callable[[], str] = get_user_message, max_steps: Optional[int] = None) -> ScheduledAgent:
+        """Register an agent; tools are searched for wait_for_mentions (defaults to the agent's own tools)."""
+        if tools is None:
+            tools = list(getattr(agent, "tool_dict", {}).values())
+        wait_tool = next((t for t in tools if getattr(t.func, "__name__", "") == WAIT_FOR_MENTIONS), None)
+        scheduled = ScheduledAgent(name, agent, user_message, max_steps, wait_tool, idle=self.min_idle)
+        self.agents[name] = scheduled
+        return scheduled
+
+    def wake(self, name: Optional[str] = None):
+        """Cut the idle wait of one agent (or of all agents) short."""
+        for scheduled in ([self.agents[name]] if name else self.agents.values()):
+            scheduled.wake_event.set()
+
+    async def run(self):
+        try:
+            await asyncio.gather(*(self._run_agent(scheduled) for scheduled in self.agents.values()))
+        finally:
+            for scheduled in self.agents.values():
+                if scheduled.poll_task is not None:
+                    scheduled.poll_task.cancel()
+
+    async def _run_agent(self, scheduled: ScheduledAgent):
+        while scheduled.max_steps is None or scheduled.steps < scheduled.max_steps:
+            message = scheduled.user_message()
+            had_mentions = bool(scheduled.pending_mentions)
+            if had_mentions:
+                message += "\n\nNew mentions:\n" + "\n".join(scheduled.pending_mentions)
+                scheduled.pending_mentions.clear()
+            scheduled.steps += 1
+            try:
+                resp = await scheduled.agent.astep(message)
+                for msg in resp.msgs:
+                    print(f"[{scheduled.name}] {msg.to_dict()}")
+                busy = had_mentions or any(record.tool_name == WAIT_FOR_MENTIONS and _has_mentions(record.result)
+                                           for record in resp.info.get("tool_calls", []))
+            except Exception as e:
+                print(f"[{scheduled.name}] Error while stepping the agent: {e}")
+                busy = had_mentions
+
+            if busy:
+                scheduled.idle = self.min_idle
+            else:
+                scheduled.idle = min(scheduled.idle * self.backoff_factor, self.max_idle)
+            if scheduled.max_steps is None or scheduled.steps < scheduled.max_steps:
+                await self._idle(scheduled, self.min_idle if busy else scheduled.idle)
+
+    async def _idle(self, scheduled: ScheduledAgent, delay: float):
+        if scheduled.pending_mentions:
+            return
+        scheduled.wake_event.clear()
+        wake = asyncio.ensure_future(scheduled.wake_event.wait())
+        waiters = [wake]
+        if scheduled.wait_for_mentions is not None:
+            # A poll left over from an earlier wake-up is still waiting on the server; reuse it
+            # rather than cancelling it, since its answer would otherwise be lost
+            if scheduled.poll_task is None or scheduled.poll_task.done():
+                scheduled.poll_task = asyncio.ensure_future(self._poll_mentions(scheduled, delay))
+            waiters.append(scheduled.poll_task)
+        try:
+            await asyncio.wait(waiters, timeout=None if len(waiters) > 1 else delay,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            wake.cancel()
+
+    async def _poll_mentions(self, scheduled: ScheduledAgent, delay: float):
+        """Wait up to delay seconds for mentions on the server; they are queued for the next step."""
+        try:
+            result = scheduled.wait_for_mentions.func(timeoutMs=int(delay * 1000))
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            print(f"[{scheduled.name}] wait_for_mentions failed: {e}")
+            await asyncio.sleep(delay)
+            return
+        if _has_mentions(result):
+            scheduled.pending_mentions.append(str(result))
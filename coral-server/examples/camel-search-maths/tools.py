@@ -1,8 +1,77 @@
 import os
+import re
+from typing import Optional
 
+import httpx
 import requests
 from camel.toolkits import BaseToolkit
 
+from page_cache import get_page_cache
+
+# Seconds before a request to r.jina.ai is abandoned
+JINA_TIMEOUT = float(os.environ.get('JINA_TIMEOUT', 30))
+
+_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_session() -> requests.Session:
+    """Pooled session shared by the blocking fetches."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Pooled client shared by the async fetches."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=JINA_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            follow_redirects=True,
+        )
+    return _async_client
+
+
+def _jina_request(url: str) -> tuple[str, dict]:
+    """Build the r.jina.ai URL and headers for a page."""
+    # Replace http with https and add https if not present
+    if not url.startswith("https://"):
+        url = "https://" + url.lstrip("https://").lstrip("http://")
+
+    jina_url = f"https://r.jina.ai/{url}"
+    headers = {}
+    if os.environ.get('JINA_PROXY_URL'):
+        headers['X-Proxy-Url'] = os.environ.get('JINA_PROXY_URL')
+
+    auth_token = os.environ.get('JINA_AUTH_TOKEN')
+    if auth_token:
+        headers['Authorization'] = f'Bearer {auth_token}'
+    return jina_url, headers
+
+
+def find_with_context(content: str, search_string: str, context_chars: int = 700, max_instances: int = 3) -> str:
+    """Context around the first max_instances case-insensitive matches, found in a single pass."""
+    instances = []
+    for match in re.finditer(re.escape(search_string), content, re.IGNORECASE):
+        if len(instances) >= max_instances:
+            break
+        context_start = max(0, match.start() - context_chars)
+        context_end = min(len(content), match.end() + context_chars)
+        instances.append(
+            f"Instance {len(instances) + 1}:\n{content[context_start:context_end]}\n"
+        )
+
+    if instances:
+        return (
+            f"Found {len(instances)} instance(s) of '{search_string}':\n\n"
+            + '\n'.join(instances)
+        )
+    else:
+        return f"Search string '{search_string}' not found in the content."
+
 
 class JinaBrowsingToolkit(BaseToolkit):
     def get_url_content(self, url: str) -> str:
@@ -15,21 +84,23 @@ class JinaBrowsingToolkit(BaseToolkit):
             str: The markdown content of the URL.
         """
 
-        # Replace http with https and add https if not present
-        if not url.startswith("https://"):
-            url = "https://" + url.lstrip("https://").lstrip("http://")
-
-        jina_url = f"https://r.jina.ai/{url}"
-        headers = {}
-        if os.environ.get('JINA_PROXY_URL'):
-            headers['X-Proxy-Url'] = os.environ.get('JINA_PROXY_URL')
-
-        auth_token = os.environ.get('JINA_AUTH_TOKEN')
-        if auth_token:
-            headers['Authorization'] = f'Bearer {auth_token}'
+        jina_url, headers = _jina_request(url)
+        # Popular pages are served from the page cache and revalidated with a conditional GET
+        page_cache = get_page_cache()
+        cached = page_cache.lookup(jina_url)
+        if cached is not None:
+            return page_cache.extract(cached, "markdown", lambda page: page.text())
         try:
-            response = requests.get(jina_url, headers=headers)
+            conditional = page_cache.conditional_headers(jina_url)
+            response = _get_session().get(jina_url, headers={**headers, **conditional}, timeout=JINA_TIMEOUT)
+            if response.status_code == 304:
+                cached = page_cache.revalidated(jina_url)
+                if cached is not None:
+                    return page_cache.extract(cached, "markdown", lambda page: page.text())
+                # The entry was evicted since the headers were built; fetch the page in full
+                response = _get_session().get(jina_url, headers=headers, timeout=JINA_TIMEOUT)
             response.raise_for_status()
+            page_cache.store(jina_url, response.content, dict(response.headers), markdown=response.text)
             return response.text
         except requests.RequestException as e:
             return f"Error fetching URL content: {e!s}"
@@ -58,28 +129,58 @@ class JinaBrowsingToolkit(BaseToolkit):
         if content.startswith("Error fetching URL content"):
             return content
 
-        instances = []
-        start = 0
-        while True:
-            index = content.lower().find(search_string.lower(), start)
-            if index == -1 or len(instances) >= max_instances:
-                break
-
-            context_start = max(0, index - context_chars)
-            context_end = min(
-                len(content), index + len(search_string) + context_chars
-            )
-            instance_context = content[context_start:context_end]
-            instances.append(
-                f"Instance {len(instances) + 1}:\n{instance_context}\n"
-            )
-
-            start = index + len(search_string)
-
-        if instances:
-            return (
-                f"Found {len(instances)} instance(s) of '{search_string}':\n\n"
-                + '\n'.join(instances)
-            )
-        else:
-            return f"Search string '{search_string}' not found in the content."
+        return find_with_context(content, search_string, context_chars, max_instances)
+
+    async def aget_url_content(self, url: str) -> str:
+        r"""Fetch the content of a URL using the r.jina.ai service, without blocking the event loop.
+
+        Args:
+            url (str): The URL to fetch content from.
+
+        Returns:
+            str: The markdown content of the URL.
+        """
+        jina_url, headers = _jina_request(url)
+        page_cache = get_page_cache()
+        cached = page_cache.lookup(jina_url)
+        if cached is not None:
+            return page_cache.extract(cached, "markdown", lambda page: page.text())
+        try:
+            conditional = page_cache.conditional_headers(jina_url)
+            response = await _get_async_client().get(jina_url, headers={**headers, **conditional})
+            if response.status_code == 304:
+                cached = page_cache.revalidated(jina_url)
+                if cached is not None:
+                    return page_cache.extract(cached, "markdown", lambda page: page.text())
+                # The entry was evicted since the headers were built; fetch the page in full
+                response = await _get_async_client().get(jina_url, headers=headers)
+            response.raise_for_status()
+            page_cache.store(jina_url, response.content, dict(response.headers), markdown=response.text)
+            return response.text
+        except httpx.HTTPError as e:
+            return f"Error fetching URL content: {e!s}"
+
+    async def aget_url_content_with_context(
+        self,
+        url: str,
+        search_string: str,
+        context_chars: int = 700,
+        max_instances: int = 3,
+    ) -> str:
+        r"""Fetch the content of a URL and return context around all instances of a specific string.
+
+        Args:
+            url (str): The URL to fetch content from.
+            search_string (str): The string to search for in the content.
+            context_chars (int): Number of characters to return before and after each found string.
+            max_instances (int): Maximum number of instances to return.
+
+        Returns:
+            str: The context around all found instances of the string, or an error message if not found.
+
+        If there are no results, try again with a more likely search string. Start with a more likely string and only use a less likely string if the first one has too many results.
+        """
+        content = await self.aget_url_content(url)
+        if content.startswith("Error fetching URL content"):
+            return content
+        return find_with_context(content, search_string, context_chars, max_instances)